@@ -0,0 +1,78 @@
+"""
+Benchmark the HTML extractors against the original BeautifulSoup parser.
+
+Usage:
+    python -m benchmarks.bench_extractors [page.html ...] [--repeat N]
+
+Without files a synthetic news page is used. For each extractor the
+script prints the mean parse time per page and the extracted text size.
+"""
+import argparse
+import statistics
+import time
+from typing import List
+from services.html_extractors import EXTRACTORS
+
+
+def synthetic_page(paragraphs: int = 60) -> str:
+    nav = "".join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(80))
+    related = "".join(f'<li><a href="/r{i}">Related story {i}</a></li>' for i in range(40))
+    body = "".join(
+        f"<p>Paragraph {i}: the company reported quarterly results and the board "
+        f"discussed an investigation into accounting practices at a subsidiary.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        "<html><head><title>Company news</title>"
+        "<script>" + "var x = 1;" * 500 + "</script><style>body{}</style></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        '<div class="cookie-consent">We use cookies to improve your experience.</div>'
+        f'<div class="layout"><article><h1>Headline</h1>{body}</article>'
+        f'<aside class="sidebar"><ul>{related}</ul></aside></div>'
+        "<footer>Copyright, terms, privacy, contact</footer></body></html>"
+    )
+
+
+def bench(pages: List[str], repeat: int) -> None:
+    configs = [("soup", False)]
+    for name in EXTRACTORS:
+        if name != "soup":
+            configs += [(name, False), (name, True)]
+
+    print(f"{'extractor':<24}{'ms/page':>10}{'chars':>10}")
+    for name, main_only in configs:
+        try:
+            extractor = EXTRACTORS[name](main_content_only=main_only)
+        except ImportError:
+            print(f"{name:<24}{'not installed':>20}")
+            continue
+        timings = []
+        chars = 0
+        for _ in range(repeat):
+            for page in pages:
+                start = time.perf_counter()
+                result = extractor.extract(page)
+                timings.append(time.perf_counter() - start)
+                chars = len(result['content'])
+        label = f"{name}{' (main)' if main_only else ''}"
+        print(f"{label:<24}{statistics.mean(timings) * 1000:>10.2f}{chars:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", help="HTML files to parse")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if not pages:
+        pages = [synthetic_page()]
+
+    bench(pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare the ONNX Runtime classifier backend with the PyTorch one.
+
+Usage:
+    python -m benchmarks.bench_inference [articles.txt ...] [--classifier finbert|zeroshot]
+                                         [--no-quantize] [--repeat N] [--model NAME]
+                                         [--min-agreement R] [--max-gap G]
+
+Each input file holds one article per line; without files a synthetic
+mix of short and long financial news is used. The script prints how
+often the backends agree on the label, the largest confidence gap and
+each backend's throughput in articles per second, and exits with status
+1 when agreement or gap are outside the parity thresholds.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List
+import classifiers.finbert
+import classifiers.zeroshort
+from classifiers.finbert import FinBertSentimentProcessor
+from classifiers.zeroshort import ZeroShotSentimentProcessor
+import classifiers.onnx_backend as onnx_backend
+
+# Default parity thresholds; int8 quantization moves confidences more than fp32 export
+MIN_AGREEMENT = 0.95
+MAX_GAP = {"fp32": 1e-3, "int8": 0.1}
+
+PROCESSORS = {
+    "finbert": FinBertSentimentProcessor,
+    "zeroshot": ZeroShotSentimentProcessor,
+}
+
+SENTENCES = [
+    "The company reported record quarterly profit and raised its full-year guidance.",
+    "Shares fell sharply after regulators opened a fraud investigation into the lender.",
+    "The board approved a routine dividend in line with last year's payout.",
+    "Analysts expect margins to remain under pressure as input costs rise.",
+    "The startup closed a new funding round led by existing investors.",
+    "A court fined the firm for illegal practices and ordered restitution.",
+    "Revenue was flat compared with the same period a year earlier.",
+    "The merger is expected to create significant cost synergies.",
+]
+
+
+def synthetic_articles(count: int = 64) -> List[str]:
+    rng = random.Random(0)
+    return [
+        " ".join(rng.choice(SENTENCES) for _ in range(rng.choice([1, 3, 10, 40, 120])))
+        for _ in range(count)
+    ]
+
+
+def timed(processor, texts: List[str], repeat: int):
+    processor.predict_with_confidence(texts[:2])  # load and warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = processor.predict_with_confidence(texts)
+    return results, len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="*", help="text files with one article per line")
+    parser.add_argument("--classifier", choices=sorted(PROCESSORS), default="finbert")
+    parser.add_argument("--no-quantize", action="store_true", help="serve the fp32 ONNX graph")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model", help="override the classifier's model name or path")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="smallest acceptable share of matching labels")
+    parser.add_argument("--max-gap", type=float,
+                        help="largest acceptable confidence gap (default 0.001 fp32, 0.1 int8)")
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    if not texts:
+        texts = synthetic_articles()
+
+    onnx_backend.ONNX_QUANTIZE = not args.no_quantize
+    # Every run must reach the model, not the classification cache
+    classifiers.finbert.classification_cache = None
+    classifiers.zeroshort.classification_cache = None
+    backends = {}
+    for backend in ("torch", "onnx"):
+        processor = PROCESSORS[args.classifier]()
+        processor.backend = backend
+        if args.model:
+            processor.model_name = args.model
+        if backend == "onnx":
+            processor._ensure_classifier()
+            if processor.onnx_session is None:
+                print("ONNX backend unavailable (is onnxruntime installed?)")
+                sys.exit(1)
+        backends[backend] = timed(processor, texts, args.repeat)
+
+    (torch_results, torch_rate), (onnx_results, onnx_rate) = backends["torch"], backends["onnx"]
+    agree = sum(a[0] == b[0] for a, b in zip(torch_results, onnx_results))
+    gap = max(abs(a[1] - b[1]) for a, b in zip(torch_results, onnx_results))
+    variant = "fp32" if args.no_quantize else "int8"
+    print(f"{args.classifier}: {len(texts)} articles")
+    print(f"label agreement   {agree}/{len(texts)} ({agree / len(texts):.1%})")
+    print(f"max conf. gap     {gap:.4f}")
+    print(f"{'torch fp32':<18}{torch_rate:>8.1f} articles/s")
+    print(f"{'onnx ' + variant:<18}{onnx_rate:>8.1f} articles/s ({onnx_rate / torch_rate:.2f}x)")
+
+    max_gap = MAX_GAP[variant] if args.max_gap is None else args.max_gap
+    if agree / len(texts) < args.min_agreement or gap > max_gap:
+        print(f"parity FAILED (need agreement >= {args.min_agreement:.0%}, gap <= {max_gap})")
+        sys.exit(1)
+    print("parity ok")
+
+
+if __name__ == "__main__":
+    main()
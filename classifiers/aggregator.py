@@ -0,0 +1,84 @@
+"""
+Incremental per-company sentiment summaries
+"""
+from typing import Any, Dict, List, Optional
+from utils.enums import Sentiment
+
+# Average sentiment score beyond which a company is labelled positive/negative
+AVERAGE_SENTIMENT_THRESHOLD = 0.3
+
+
+def average_sentiment_label(avg_score: float) -> str:
+    """Convert average score to sentiment label matching the enum"""
+    if avg_score > AVERAGE_SENTIMENT_THRESHOLD:
+        return Sentiment.POSITIVE.value
+    elif avg_score < -AVERAGE_SENTIMENT_THRESHOLD:
+        return Sentiment.NEGATIVE.value
+    return Sentiment.NEUTRAL.value
+
+
+class CompanyStats:
+    """Running statistics of one company; size does not grow with its article count"""
+
+    __slots__ = ("count", "score_sum", "labels", "negative_articles", "categories")
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.labels: Dict[str, int] = {}
+        self.negative_articles = 0
+        # Category -> number of articles that hit it
+        self.categories: Dict[str, int] = {}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.count += 1
+        self.score_sum += result.get('sentiment_score', 0)
+        label = result.get('sentiment') or Sentiment.NEUTRAL.value
+        self.labels[label] = self.labels.get(label, 0) + 1
+        if result.get('negative_news_flag', False):
+            self.negative_articles += 1
+        for category in result.get('negative_news_categories') or {}:
+            self.categories[category] = self.categories.get(category, 0) + 1
+
+
+class SentimentAggregator:
+    """
+    Takes classified articles as they arrive and keeps O(1) running stats
+    per company; snapshot() gives the summary so far at any moment.
+    """
+
+    def __init__(self):
+        self.companies: Dict[str, CompanyStats] = {}
+        self.articles = 0
+
+    def add(self, result: Optional[Dict[str, Any]], company: Optional[str] = None) -> None:
+        """Count one classified article for company (default: its company_name)"""
+        if not result:
+            return
+        company = company or result.get('company_name')
+        if not company:
+            return
+        stats = self.companies.get(company)
+        if stats is None:
+            stats = self.companies[company] = CompanyStats()
+        stats.add(result)
+        self.articles += 1
+
+    def add_all(self, results: List[Optional[Dict[str, Any]]]) -> None:
+        for result in results:
+            self.add(result)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-company summary of everything added so far"""
+        return [
+            {
+                "company_name": company,
+                "average_sentiment": average_sentiment_label(stats.score_sum / stats.count),
+                "negative_news_flag": stats.negative_articles > 0,
+                "total_articles": stats.count,
+                "sentiment_counts": dict(stats.labels),
+                "negative_articles": stats.negative_articles,
+                "negative_news_categories": dict(stats.categories)
+            }
+            for company, stats in self.companies.items()
+        ]
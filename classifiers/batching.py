@@ -0,0 +1,51 @@
+"""
+Length-bucketed dynamic batching for the transformer classifiers
+"""
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def token_budget_batches(lengths: Sequence[int], max_tokens: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Group item indices into batches of similar length.
+
+    Items are sorted by token length and cut greedily so that each batch's
+    padded size (items x longest item) stays within max_tokens and it holds
+    at most max_batch_size items. A single item longer than max_tokens gets
+    a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in order:
+        # Sorted ascending, so the newest item is the batch's longest
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * lengths[i] > max_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def run_bucketed(items: Sequence[T], lengths: Sequence[int], run_batch: Callable[[List[T]], Sequence[R]],
+                 max_tokens: int, max_batch_size: int) -> List[R]:
+    """
+    Call run_batch on length-bucketed batches of items and return its
+    per-item results in the original order of items.
+    """
+    results: List[R] = [None] * len(items)
+    for batch in token_budget_batches(lengths, max_tokens, max_batch_size):
+        for i, result in zip(batch, run_batch([items[i] for i in batch])):
+            results[i] = result
+    return results
+
+
+def pad_batch(sequences: Sequence[List[int]], pad_id: int):
+    """Right-pad token id lists to the longest one; returns (input_ids, attention_mask)"""
+    width = max(len(ids) for ids in sequences)
+    input_ids = [list(ids) + [pad_id] * (width - len(ids)) for ids in sequences]
+    attention_mask = [[1] * len(ids) + [0] * (width - len(ids)) for ids in sequences]
+    return input_ids, attention_mask
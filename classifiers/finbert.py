@@ -1,18 +1,25 @@
 import json
-from collections import defaultdict
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import os
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
 import torch
-import torch.nn.functional as F
 from utils.sync_logger import sync_logger as logger
-from utils.enums import Sentiment
+from utils.config import (
+    INFERENCE_BACKEND,
+    FINBERT_MAX_LENGTH,
+    FINBERT_MAX_WINDOWS,
+    FINBERT_WINDOW_STRIDE,
+    FINBERT_MAX_CHARS,
+    FINBERT_BATCH_TOKENS,
+    FINBERT_MAX_BATCH_SIZE
+)
+from classifiers.batching import pad_batch, run_bucketed
+from classifiers.onnx_backend import EXPORT_EXAMPLE_TEXTS, load_onnx_session, weights_revision
+from classifiers.result_cache import classification_cache
+from classifiers.negative_news import negative_news_matcher
+from classifiers.aggregator import SentimentAggregator, average_sentiment_label
 import threading
-from typing import Dict, List
-
-
-NEGATIVE_KEYWORDS = [
-    "fraud", "scam", "lawsuit", "corruption", "controversy",
-    "penalty", "fine", "arrest", "investigation", "illegal"
-]
+from typing import Dict, List, Tuple
 
 
 SENTIMENT_SCORES = {
@@ -22,135 +29,201 @@ SENTIMENT_SCORES = {
 }
 
 
+def token_windows(ids: List[int], window: int, stride: int, max_windows: int) -> List[List[int]]:
+    """
+    Split token ids into windows of at most window tokens overlapping by
+    stride. When there are more than max_windows, evenly spaced ones are
+    kept (always the first and the last) so the cost per text is bounded.
+    """
+    if len(ids) <= window:
+        return [ids]
+    step = max(window - stride, 1)
+    starts = [0]
+    while starts[-1] + window < len(ids):
+        starts.append(starts[-1] + step)
+    if len(starts) > max_windows:
+        if max_windows <= 1:
+            starts = starts[:1]
+        else:
+            last = len(starts) - 1
+            starts = [starts[round(k * last / (max_windows - 1))] for k in range(max_windows)]
+    return [ids[start:start + window] for start in starts]
+
+
 class FinBertSentimentProcessor:
     def __init__(self):
         self.classifier = None
+        self.tokenizer = None
+        self.onnx_session = None
+        self.weights_revision = None
+        self.backend = INFERENCE_BACKEND
         self._init_lock = threading.Lock()
         self._initialized = False
         self.model_name = "yiyanghkust/finbert-tone"
         self.label_map = {0: "neutral", 1: "positive", 2: "negative"}
     
     def _ensure_classifier(self):
-        """Ensure classifier is initialized (thread-safe) - Similar to ZeroShot pattern"""
+        """Ensure tokenizer and model are initialized (thread-safe) - Similar to ZeroShot pattern"""
         if not self._initialized:
             with self._init_lock:
                 if not self._initialized:  # Proper double-check pattern
                     try:
                         logger.info(f"Initializing FinBERT classifier for thread: {threading.current_thread().name}")
-                        self.classifier = pipeline(
-                            "text-classification",
-                            model=self.model_name,
-                            device=-1,  # Force CPU for thread safety
-                            return_all_scores=True
-                        )
+                        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+                        model.eval()  # CPU only, for thread safety
+                        id2label = getattr(model.config, "id2label", None) or {}
+                        self.label_map = {
+                            int(i): self._normalize_label(label, self.label_map.get(int(i), "neutral"))
+                            for i, label in id2label.items()
+                        } or self.label_map
+                        self.weights_revision = weights_revision(self.model_name, model.config)
+                        if self.backend == "onnx":
+                            windows = [w for ws in self._encode_windows(EXPORT_EXAMPLE_TEXTS) for w in ws]
+                            example = pad_batch(windows, self.tokenizer.pad_token_id or 0)
+                            self.onnx_session = load_onnx_session(self.model_name, model, example)
+                        # With an ONNX session the torch weights are not kept in memory
+                        self.classifier = self.onnx_session or model
                         self._initialized = True
                         logger.info("FinBERT classifier initialized successfully")
                     except Exception as e:
                         logger.error(f"Failed to initialize FinBERT classifier: {str(e)}")
                         self.classifier = None
 
-
-    def predict(self, text: str) -> str:
-        """Predict sentiment using FinBERT"""
-        if not text or not text.strip():
+    @staticmethod
+    def _normalize_label(label: str, default: str) -> str:
+        """Map FinBERT labels to standard format"""
+        label = str(label).lower()
+        if 'positive' in label:
+            return "positive"
+        elif 'negative' in label:
+            return "negative"
+        elif 'neutral' in label:
             return "neutral"
+        return default
+
+    def _run_model(self, input_ids: List[List[int]], attention_mask: List[List[int]]) -> np.ndarray:
+        """Forward pass over one padded batch of windows, returning logits"""
+        if self.onnx_session is not None:
+            return self.onnx_session.run(input_ids, attention_mask)
+        with torch.no_grad():
+            outputs = self.classifier(
+                input_ids=torch.tensor(input_ids, dtype=torch.long),
+                attention_mask=torch.tensor(attention_mask, dtype=torch.long)
+            )
+        return outputs.logits.numpy()
+
+    def _encode_windows(self, texts: List[str]) -> List[List[List[int]]]:
+        """Token windows (special tokens included) of the first FINBERT_MAX_CHARS characters of every text"""
+        # FinBERT is a BERT model: every window is wrapped as [CLS] ... [SEP]
+        cls_id, sep_id = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+        window = FINBERT_MAX_LENGTH - 2
+        encoded = self.tokenizer(
+            [(text or "")[:FINBERT_MAX_CHARS] for text in texts], add_special_tokens=False, truncation=False,
+            return_attention_mask=False, verbose=False
+        )["input_ids"]
+        return [
+            [[cls_id] + chunk + [sep_id]
+             for chunk in token_windows(ids, window, FINBERT_WINDOW_STRIDE, FINBERT_MAX_WINDOWS)]
+            if ids else []
+            for ids in encoded
+        ]
+
+    def _score_windows(self, windows: List[List[int]]) -> np.ndarray:
+        """Class probabilities of one batch of token windows"""
+        input_ids, attention_mask = pad_batch(windows, self.tokenizer.pad_token_id or 0)
+        logits = self._run_model(input_ids, attention_mask)
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def model_revision(self) -> str:
+        """Everything besides the text that changes the output: lexicon, weights, backend and windowing"""
+        backend = os.path.basename(self.onnx_session.path) if self.onnx_session is not None else "torch"
+        return (f"{self.model_name}@{self.weights_revision}|{backend}|lexicon:{negative_news_matcher.version}|"
+                f"{FINBERT_MAX_CHARS}/{FINBERT_MAX_LENGTH}/{FINBERT_MAX_WINDOWS}/{FINBERT_WINDOW_STRIDE}")
+
+    def _analyze_uncached(self, texts: List[str]) -> List[Dict]:
+        """
+        Score each text over at most FINBERT_MAX_WINDOWS token windows of
+        FINBERT_MAX_LENGTH tokens. All windows go through the model in
+        length-bucketed batches of at most FINBERT_BATCH_TOKENS padded
+        tokens, and each text's label is the argmax of its windows'
+        mean probabilities (weighted by window length), with that
+        probability as the confidence.
+        """
+        # One lexicon scan over the whole batch
+        categories = negative_news_matcher.match_batch(texts)
+
+        def fallback(error: str) -> List[Dict]:
+            return [{"label": "neutral", "confidence": 0.0, "scores": {},
+                     "negative_news_flag": bool(hits), "negative_news_categories": hits, "error": error}
+                    for hits in categories]
 
-        self._ensure_classifier()
         if self.classifier is None:
             logger.warning("FinBERT classifier not available, returning neutral")
-            return "neutral"
-
-        max_length = 512
-        if len(text) > max_length:
-            text = text[:max_length]
+            return fallback("classifier not available")
 
         try:
-            result = self.classifier(text)
-            if result and len(result) > 0:
-                # Get the label with highest score
-                best_result = max(result, key=lambda x: x['score'])
-                label = best_result['label'].lower()
-                
-                # Map FinBERT labels to standard format
-                if 'positive' in label:
-                    return "positive"
-                elif 'negative' in label:
-                    return "negative"
-                else:
-                    return "neutral"
-            
-            return "neutral"
+            windows_per_text = self._encode_windows(texts)
+            flat = [(i, ids) for i, windows in enumerate(windows_per_text) for ids in windows]
 
-        except Exception as e:
-            logger.error(f"Error in FinBERT sentiment prediction: {str(e)}")
-            return "neutral"
+            scored = run_bucketed(
+                [ids for _, ids in flat], [len(ids) for _, ids in flat], self._score_windows,
+                FINBERT_BATCH_TOKENS, FINBERT_MAX_BATCH_SIZE
+            )
+            probabilities = [[] for _ in texts]
+            for (i, ids), probs in zip(flat, scored):
+                probabilities[i].append((len(ids), probs))
 
-    def predict_batch(self, texts: List[str]) -> List[str]:
-        """Predict sentiment for multiple texts in batch"""
-        if not texts:
-            return []
-        
-        self._ensure_classifier()
-        if self.classifier is None:
-            return ["neutral"] * len(texts)
-        
-        # Truncate texts to max length
-        max_length = 512
-        processed_texts = [text[:max_length] if text and len(text) > max_length 
-                          else (text or "") for text in texts]
-        
-        try:
-            # FinBERT pipeline can handle batch processing
             results = []
-            
-            # Process in smaller batches to avoid memory issues
-            batch_size = 16  # Adjust based on your memory constraints
-            for i in range(0, len(processed_texts), batch_size):
-                batch_texts = processed_texts[i:i + batch_size]
-                
-                # Filter empty texts
-                valid_texts = [text for text in batch_texts if text.strip()]
-                if not valid_texts:
-                    results.extend(["neutral"] * len(batch_texts))
-                    continue
-                
-                try:
-                    batch_results = self.classifier(valid_texts)
-                    
-                    # Process results
-                    valid_idx = 0
-                    for text in batch_texts:
-                        if not text.strip():
-                            results.append("neutral")
-                        else:
-                            if valid_idx < len(batch_results):
-                                result = batch_results[valid_idx]
-                                if isinstance(result, list) and result:
-                                    # Get the label with highest score
-                                    best_result = max(result, key=lambda x: x['score'])
-                                    label = best_result['label'].lower()
-                                    
-                                    if 'positive' in label:
-                                        results.append("positive")
-                                    elif 'negative' in label:
-                                        results.append("negative")
-                                    else:
-                                        results.append("neutral")
-                                else:
-                                    results.append("neutral")
-                                valid_idx += 1
-                            else:
-                                results.append("neutral")
-                                
-                except Exception as batch_e:
-                    logger.error(f"Error in batch processing: {str(batch_e)}")
-                    results.extend(["neutral"] * len(batch_texts))
-            
+            for hits, windows in zip(categories, probabilities):
+                result = {"label": "neutral", "confidence": 0.0, "scores": {},
+                          "negative_news_flag": bool(hits), "negative_news_categories": hits}
+                if windows:
+                    weights = np.array([length for length, _ in windows], dtype=float)
+                    mean = np.average(np.stack([probs for _, probs in windows]), axis=0, weights=weights)
+                    best = int(mean.argmax())
+                    result.update(
+                        label=self.label_map.get(best, "neutral"),
+                        confidence=float(mean[best]),
+                        scores={self.label_map.get(j, str(j)): float(p) for j, p in enumerate(mean)}
+                    )
+                results.append(result)
             return results
-            
+
         except Exception as e:
             logger.error(f"Error in batch FinBERT prediction: {str(e)}")
-            return ["neutral"] * len(texts)
+            return fallback(str(e))
+
+    def analyze(self, texts: List[str]) -> List[Dict]:
+        """
+        Label, confidence, per-label scores, negative flag and per-category
+        negative-news hit counts of each text.
+        Texts classified before (same model revision and normalized text)
+        come from the classification cache; only the misses are scored.
+        """
+        if not texts:
+            return []
+        self._ensure_classifier()
+        if classification_cache is None:
+            return self._analyze_uncached(texts)
+        return classification_cache.cached_analyze(
+            "finbert", self.model_revision(), texts, self._analyze_uncached
+        )
+
+    def predict_with_confidence(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """(label, confidence) of each text"""
+        return [(result["label"], result["confidence"]) for result in self.analyze(texts)]
+
+    def predict(self, text: str) -> str:
+        """Predict sentiment using FinBERT"""
+        if not text or not text.strip():
+            return "neutral"
+        return self.predict_with_confidence([text])[0][0]
+
+    def predict_batch(self, texts: List[str]) -> List[str]:
+        """Predict sentiment for multiple texts in batch"""
+        return [label for label, _ in self.predict_with_confidence(texts)]
 
     def process_news_batch(self, news_items: List[Dict]) -> List[Dict]:
         """Process multiple news items in batch"""
@@ -165,19 +238,20 @@ class FinBertSentimentProcessor:
             combined_text = f"{title}. {content}" if title else content
             texts.append(combined_text)
         
-        # Get batch predictions
-        sentiments = self.predict_batch(texts)
+        # Get batch predictions (cached articles are not scored again)
+        analyses = self.analyze(texts)
         
         # Process results
         results = []
-        for i, (item, sentiment) in enumerate(zip(news_items, sentiments)):
+        for i, (item, analysis) in enumerate(zip(news_items, analyses)):
             try:
                 company = item.get('company')
                 title = item.get('title', '')
                 content = item.get('content', '')
-                combined_text = texts[i]
-                
-                negative_flag = self.flag_negative_news(combined_text)
+                sentiment = analysis["label"]
+                confidence = analysis["confidence"]
+                negative_flag = analysis["negative_news_flag"]
+                negative_categories = analysis.get("negative_news_categories", {})
                 
                 results.append({
                     "company_name": str(company) if company else "",
@@ -185,29 +259,19 @@ class FinBertSentimentProcessor:
                     "content": str(content),
                     "sentiment": sentiment,
                     "sentiment_score": SENTIMENT_SCORES.get(sentiment, 0),
-                    "negative_news_flag": negative_flag
+                    "sentiment_confidence": confidence,
+                    "negative_news_flag": negative_flag,
+                    "negative_news_categories": negative_categories
                 })
             except Exception as e:
                 logger.error(f"Error processing news item {i}: {str(e)}")
-                continue
+                results.append(None)  # keep results aligned with news_items
         
         return results
 
-    def flag_negative_news(self, text: str) -> bool:
-        """Check if text contains negative keywords"""
-        if not text:
-            return False
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in NEGATIVE_KEYWORDS)
-
     def average_sentiment_label(self, avg_score: float) -> str:
         """Convert average score to sentiment label matching the enum"""
-        if avg_score > 0.3:
-            return Sentiment.POSITIVE.value
-        elif avg_score < -0.3:
-            return Sentiment.NEGATIVE.value
-        else:
-            return Sentiment.NEUTRAL.value
+        return average_sentiment_label(avg_score)
 
     def process_news(self, content: str, title: str, company: str = None):
         """Process a single news item (thread-safe)"""
@@ -219,8 +283,10 @@ class FinBertSentimentProcessor:
             # Combine title and content
             combined_text = f"{title}. {content}" if title else content
             
-            sentiment = self.predict(combined_text)
-            negative_flag = self.flag_negative_news(combined_text)
+            analysis = self.analyze([combined_text])[0]
+            sentiment, confidence = analysis["label"], analysis["confidence"]
+            negative_flag = analysis["negative_news_flag"]
+            negative_categories = analysis.get("negative_news_categories", {})
 
             return {
                 "company_name": str(company),
@@ -228,7 +294,9 @@ class FinBertSentimentProcessor:
                 "content": str(content) if content else "",
                 "sentiment": sentiment,
                 "sentiment_score": SENTIMENT_SCORES.get(sentiment, 0),
-                "negative_news_flag": negative_flag
+                "sentiment_confidence": confidence,
+                "negative_news_flag": negative_flag,
+                "negative_news_categories": negative_categories
             }
         except Exception as e:
             logger.error(f"Error processing news with FinBERT for {company}: {str(e)}")
@@ -241,37 +309,9 @@ class FinBertSentimentProcessor:
             return []
 
         try:
-            company_sentiments = defaultdict(list)
-            company_negative_flags = defaultdict(bool)
-
-            # Group by company
-            for result in processed_results:
-                if not result or not result.get('company_name'):
-                    continue
-
-                company = result['company_name']
-                sentiment_score = result.get('sentiment_score', 0)
-                negative_flag = result.get('negative_news_flag', False)
-
-                company_sentiments[company].append(sentiment_score)
-                company_negative_flags[company] = company_negative_flags[company] or negative_flag
-
-            # Generate summaries
-            summary = []
-            for company, scores in company_sentiments.items():
-                if not scores:
-                    continue
-
-                avg_score = sum(scores) / len(scores)
-                avg_sentiment = self.average_sentiment_label(avg_score)
-                negative_flag = company_negative_flags.get(company, False)
-
-                summary.append({
-                    "company_name": company,
-                    "average_sentiment": avg_sentiment,
-                    "negative_news_flag": negative_flag,
-                    "total_articles": len(scores)
-                })
+            aggregator = SentimentAggregator()
+            aggregator.add_all(processed_results)
+            summary = aggregator.snapshot()
 
             logger.info(f"Generated FinBERT summary for {len(summary)} companies")
             return summary
@@ -285,6 +325,8 @@ class FinBertSentimentProcessor:
         try:
             if self.classifier is not None:
                 self.classifier = None
+                self.tokenizer = None
+                self.onnx_session = None
                 self._initialized = False
                 logger.info(f"Cleaned up FinBERT classifier for thread: {threading.current_thread().name}")
         except Exception as e:
@@ -295,6 +337,7 @@ class FinBertSentimentProcessor:
         return {
             "initialized": self._initialized,
             "classifier_available": self.classifier is not None,
+            "backend": "onnx" if self.onnx_session is not None else "torch",
             "thread": threading.current_thread().name
         }
 
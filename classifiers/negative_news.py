@@ -0,0 +1,130 @@
+"""
+Categorized negative-news lexicon and its single-pass matcher
+"""
+import hashlib
+import re
+from bisect import bisect_right
+from typing import Dict, List
+
+# Category -> terms. Terms match whole words, case-insensitively, with an
+# optional plural/verb/adverb ending (s, es, d, ed, ing, ly); a final
+# consonant + y also matches -ies/-ied ("penalties"); spaces match any whitespace.
+# Words that are common in neutral text ("default", "fine", "sue", "ban",
+# "custody") only count inside a phrase that gives them the negative sense.
+# Category names must be valid Python identifiers.
+NEGATIVE_NEWS_LEXICON: Dict[str, List[str]] = {
+    "fraud": [
+        "fraud", "fraudulent", "scam", "scammed", "scammer", "ponzi", "embezzle", "embezzlement",
+        "misappropriation", "money laundering", "forgery", "insider trading", "accounting irregularities",
+        "siphon", "cheat", "cheating", "swindle"
+    ],
+    "corruption": ["corruption", "corrupt", "bribe", "bribery", "kickback"],
+    "litigation": [
+        "lawsuit", "sued", "sues", "suing", "litigation", "class action", "legal action", "legal battle",
+        "petition against", "court case"
+    ],
+    "regulatory": [
+        "penalty", "penalise", "penalize", "fined", "fine of", "sanctions against", "sanctions on",
+        "investigation", "investigate", "probe", "show cause notice", "show-cause notice",
+        "enforcement action", "regulatory action", "violation", "non-compliance", "debar",
+        "banned from", "ban on"
+    ],
+    "criminal": [
+        "arrest", "indict", "indictment", "charge sheet", "chargesheet", "convict", "conviction",
+        "raid", "detain", "police custody", "judicial custody", "into custody", "illegal", "unlawful",
+        "criminal"
+    ],
+    "financial_distress": [
+        "defaulted on", "defaults on", "loan default", "debt default", "payment default", "bond default",
+        "bankruptcy", "bankrupt", "insolvency", "insolvent", "liquidation"
+    ],
+    "controversy": ["controversy", "controversial", "scandal", "allegation", "alleged", "whistleblower"],
+}
+
+INFLECTION = r"(?:s|es|d|ed|ing|ly)?"
+# "penalty" -> "penalties", "bankruptcy" -> "bankruptcies"
+Y_STEM_RE = re.compile(r"[^aeiou\s]y$")
+# Joins the texts of a batch. The NUL is neither a word character nor whitespace,
+# so no term (not even a multi-word one matching \s+) can span two texts
+BATCH_SEPARATOR = "\n\x00\n"
+
+
+def _with_y_forms(terms: List[str]) -> List[str]:
+    """Terms plus the -ies/-ied forms of those ending in consonant + y"""
+    expanded = []
+    for term in terms:
+        expanded.append(term)
+        if Y_STEM_RE.search(term.lower()):
+            expanded.extend([term[:-1] + "ies", term[:-1] + "ied"])
+    return expanded
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    """
+    Alternation of lower-case terms folded into a prefix trie, e.g.
+    fraud|fraudulent -> fraud(?:ulent)?; re backtracks far less on it
+    than on a flat list of alternatives.
+    """
+    trie: Dict = {}
+    for term in _with_y_forms(terms):
+        node = trie
+        for ch in " ".join(term.lower().split()):
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class NegativeNewsMatcher:
+    """
+    One compiled word-boundary regex with a named group per category, so
+    a text is scanned once whatever the size of the lexicon. Texts are
+    lower-cased before matching, which is cheaper than re.IGNORECASE.
+    """
+
+    def __init__(self, lexicon: Dict[str, List[str]]):
+        self.lexicon = lexicon
+        groups = "|".join(
+            f"(?P<{category}>{_trie_pattern(terms)})" for category, terms in lexicon.items()
+        )
+        # Cheap first-letter check before trying the alternation at a word start
+        first_letters = "".join(sorted({term[0].lower() for terms in lexicon.values() for term in terms}))
+        self.pattern = re.compile(rf"\b(?=[{re.escape(first_letters)}])(?:{groups}){INFLECTION}\b")
+        # Hash the compiled pattern so inflection changes also invalidate cached results
+        self.version = hashlib.sha256(self.pattern.pattern.encode("utf-8")).hexdigest()[:12]
+
+    def match(self, text: str) -> Dict[str, int]:
+        """Hit count per category (categories without hits are left out)"""
+        counts: Dict[str, int] = {}
+        if text:
+            for m in self.pattern.finditer(text.lower()):
+                counts[m.lastgroup] = counts.get(m.lastgroup, 0) + 1
+        return counts
+
+    def match_batch(self, texts: List[str]) -> List[Dict[str, int]]:
+        """match() for every text, in one scan over the joined batch"""
+        lowered = [(text or "").lower() for text in texts]
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + len(BATCH_SEPARATOR)
+        counts: List[Dict[str, int]] = [{} for _ in texts]
+        for m in self.pattern.finditer(BATCH_SEPARATOR.join(lowered)):
+            hits = counts[bisect_right(starts, m.start()) - 1]
+            hits[m.lastgroup] = hits.get(m.lastgroup, 0) + 1
+        return counts
+
+
+negative_news_matcher = NegativeNewsMatcher(NEGATIVE_NEWS_LEXICON)
+
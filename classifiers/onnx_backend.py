@@ -0,0 +1,160 @@
+"""
+ONNX Runtime backend for the transformer classifiers, with optional
+dynamic int8 quantization
+"""
+import fcntl
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+import numpy as np
+import torch
+from utils.sync_logger import sync_logger as logger
+from utils.config import ONNX_MODEL_DIR, ONNX_QUANTIZE, ONNX_NUM_THREADS
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:  # optional dependency
+    ort = None
+
+ONNX_OPSET = 17
+INPUT_NAMES = ["input_ids", "attention_mask"]
+# Texts a classifier encodes (its own way) into the example batch the export
+# traces; a short and a long one so the graph keeps the padding path
+EXPORT_EXAMPLE_TEXTS = [
+    "Company reports quarterly results.",
+    "Shares fell sharply after regulators opened an investigation into the lender's accounts."
+]
+# (input_ids, attention_mask) of a padded example batch
+ExampleBatch = Tuple[List[List[int]], List[List[int]]]
+
+
+def weights_revision(model_name: str, config: Any) -> str:
+    """
+    Hub commit of the loaded weights; for a local model directory, a hash
+    of its files' sizes and modification times.
+    """
+    commit = getattr(config, "_commit_hash", None)
+    if commit:
+        return commit[:12]
+    if os.path.isdir(model_name):
+        files = sorted(
+            (entry.name, entry.stat().st_size, int(entry.stat().st_mtime))
+            for entry in os.scandir(model_name) if entry.is_file()
+        )
+        return hashlib.sha256(repr(files).encode("utf-8")).hexdigest()[:12]
+    return "local"
+
+
+def _model_dir(model_name: str, revision: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r"[^\w.-]+", "--", model_name.strip("/")), revision)
+
+
+@contextmanager
+def _export_lock(model_dir: str):
+    """Exclusive lock on a model's export directory, shared by every worker process"""
+    with open(os.path.join(model_dir, ".export.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Traceable wrapper returning just the logits (BART also returns a key/value cache object)"""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        kwargs = {"use_cache": False} if getattr(self.model.config, "is_encoder_decoder", False) else {}
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, **kwargs).logits
+
+
+def _export_fp32(model_name: str, model: torch.nn.Module, example: ExampleBatch, fp32_path: str) -> None:
+    logger.info(f"Exporting {model_name} to ONNX at {fp32_path}")
+    # Real encoded inputs: BART checks its </s> tokens while being traced
+    input_ids = torch.tensor(example[0], dtype=torch.long)
+    attention_mask = torch.tensor(example[1], dtype=torch.long)
+    tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model), (input_ids, attention_mask), tmp_path,
+            input_names=INPUT_NAMES, output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=ONNX_OPSET,
+            dynamo=False
+        )
+    os.replace(tmp_path, fp32_path)
+
+
+def export_onnx(model_name: str, model: torch.nn.Module, example: ExampleBatch,
+                quantize: Optional[bool] = None) -> str:
+    """
+    Export a loaded sequence-classification model to ONNX (once per weights
+    revision, under ONNX_MODEL_DIR), tracing it on the example batch, and
+    return the path of the file to serve: the fp32 graph, or its
+    dynamically int8-quantized copy.
+    Workers starting together export under a file lock; the others wait
+    and reuse the result.
+    """
+    quantize = ONNX_QUANTIZE if quantize is None else quantize
+    model_dir = _model_dir(model_name, weights_revision(model_name, model.config))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(model_dir, exist_ok=True)
+    with _export_lock(model_dir):
+        # Another worker may have finished the export while this one waited
+        if not os.path.exists(fp32_path):
+            _export_fp32(model_name, model, example, fp32_path)
+        if quantize and not os.path.exists(int8_path):
+            logger.info(f"Quantizing {model_name} to int8 at {int8_path}")
+            tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+    return target
+
+
+class OnnxClassifierSession:
+    """ONNX Runtime session with the same logits-in/logits-out shape as the torch forward pass"""
+
+    def __init__(self, path: str, num_threads: int = ONNX_NUM_THREADS):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def run(self, input_ids: List[List[int]], attention_mask: List[List[int]]) -> np.ndarray:
+        return self.session.run(["logits"], {
+            "input_ids": np.asarray(input_ids, dtype=np.int64),
+            "attention_mask": np.asarray(attention_mask, dtype=np.int64)
+        })[0]
+
+
+def load_onnx_session(model_name: str, model: torch.nn.Module, example: ExampleBatch,
+                      quantize: Optional[bool] = None) -> Optional[OnnxClassifierSession]:
+    """ONNX session for a loaded model, or None (stay on torch) when onnxruntime is missing or export fails"""
+    if ort is None:
+        logger.warning("onnxruntime is not installed, using the torch backend")
+        return None
+    try:
+        session = OnnxClassifierSession(export_onnx(model_name, model, example, quantize))
+        logger.info(f"Serving {model_name} with ONNX Runtime from {session.path}")
+        return session
+    except Exception as e:
+        logger.error(f"ONNX backend unavailable for {model_name}, using torch: {str(e)}")
+        return None
@@ -0,0 +1,114 @@
+"""
+Content-hash keyed cache of classification results
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from utils.cache_store import SQLiteCache, hash_key
+from utils.config import (
+    CLASSIFICATION_CACHE_ENABLED,
+    CLASSIFICATION_CACHE_MEMORY_ENTRIES,
+    CLASSIFICATION_CACHE_DISK_ENABLED,
+    CLASSIFICATION_CACHE_PATH,
+    CLASSIFICATION_CACHE_MAX_ENTRIES
+)
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-collapsed text; the form whose hash identifies an article"""
+    return " ".join((text or "").split())
+
+
+def classification_key(classifier: str, revision: str, text: str) -> str:
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return hash_key(classifier, revision, text_hash)
+
+
+class ClassificationCache:
+    """
+    In-memory LRU of classification results with an optional SQLite tier.
+    Disk hits are promoted to memory; writes go to both tiers.
+    """
+
+    def __init__(self, memory_entries: int = CLASSIFICATION_CACHE_MEMORY_ENTRIES,
+                 store: Optional[SQLiteCache] = None):
+        self.memory_entries = memory_entries
+        self.store = store
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.store is not None:
+            raw = self.store.get(key)
+            if raw is not None:
+                value = json.loads(raw)
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict) -> None:
+        self._remember(key, value)
+        if self.store is not None:
+            self.store.set(key, json.dumps(value))
+
+    def cached_analyze(self, classifier: str, revision: str, texts: List[str],
+                       analyze: Callable[[List[str]], List[Dict]]) -> List[Dict]:
+        """
+        Results of analyze(texts), calling it only for texts without a cached
+        result, each distinct text once. Results of analyze are cached unless
+        they carry an "error" key.
+        """
+        keys = [classification_key(classifier, revision, text) for text in texts]
+        results: List[Optional[Dict]] = [self.get(key) for key in keys]
+
+        pending: Dict[str, int] = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None and key not in pending:
+                pending[key] = i
+        if pending:
+            fresh = analyze([texts[i] for i in pending.values()])
+            by_key = dict(zip(pending, fresh))
+            for key, value in by_key.items():
+                if not value.get("error"):
+                    self.set(key, value)
+            results = [result if result is not None else by_key[key]
+                       for key, result in zip(keys, results)]
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {"memory_entries": len(self._memory), "hits": self.hits, "misses": self.misses}
+        if self.store is not None:
+            stats["disk"] = self.store.stats()
+        return stats
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+
+classification_cache = ClassificationCache(
+    store=SQLiteCache(CLASSIFICATION_CACHE_PATH, "classification_results", CLASSIFICATION_CACHE_MAX_ENTRIES)
+    if CLASSIFICATION_CACHE_DISK_ENABLED else None
+) if CLASSIFICATION_CACHE_ENABLED else None
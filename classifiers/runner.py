@@ -0,0 +1,59 @@
+"""
+Classifier entry points shared by the API process and the inference server
+"""
+from typing import Dict, List
+from utils.config import CLASSIFIER_TYPE
+from utils.enums import ClassifierType
+from classifiers.finbert import finbert_classifier
+from classifiers.zeroshort import zeroshort_classifier
+from services.inference_scheduler import InferenceScheduler
+
+
+def classify_sync(content: str, title: str, company: str):
+    """Synchronous classification function"""
+    try:
+        if CLASSIFIER_TYPE == ClassifierType.FINBERT:
+            print(f"Using FinBERT Sentiment Classification for {company}")
+            return finbert_classifier.process_news(content, title, company=company)
+        elif CLASSIFIER_TYPE == ClassifierType.ZEROSHORT:
+            print(f"Using Zero-Shot Sentiment Classification for {company}")
+            return zeroshort_classifier.process_news(content, title, company=company)
+        return None
+    except Exception as e:
+        print(f"Error in classification for {company}: {str(e)}")
+        return None
+
+
+# Short and long inputs so warm-up exercises padding and multi-window batches
+WARMUP_TEXTS = [
+    "Company reports quarterly results.",
+    "The board announced a new chief executive after regulators opened an investigation. " * 60
+]
+
+
+def warm_up_classifier_sync():
+    """Load the configured classifier and run one forward pass over WARMUP_TEXTS"""
+    classifier = finbert_classifier if CLASSIFIER_TYPE == ClassifierType.FINBERT else zeroshort_classifier
+    classifier._ensure_classifier()
+    if classifier.classifier is None:
+        raise RuntimeError(f"{CLASSIFIER_TYPE} classifier failed to load")
+    classifier.predict_batch(WARMUP_TEXTS)
+
+
+def batch_classify_sync(news_items: List[Dict]):
+    """Synchronous batch classification function; one result per item, errors are raised"""
+    try:
+        if CLASSIFIER_TYPE == ClassifierType.ZEROSHORT:
+            print(f"Using Zero-Shot Batch Sentiment Classification for {len(news_items)} items")
+            return zeroshort_classifier.process_news_batch(news_items)
+        elif CLASSIFIER_TYPE == ClassifierType.FINBERT:
+            print(f"Using FinBERT Batch Sentiment Classification for {len(news_items)} items")
+            return finbert_classifier.process_news_batch(news_items)
+        raise ValueError(f"Unknown classifier type: {CLASSIFIER_TYPE}")
+    except Exception as e:
+        print(f"Error in batch classification: {str(e)}")
+        raise
+
+
+# Articles from all concurrent requests share forward passes
+classification_scheduler = InferenceScheduler(batch_classify_sync)
@@ -1,17 +1,28 @@
-from collections import defaultdict
-from transformers import pipeline
+import os
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
+import torch
 import logging
-from utils.enums import Sentiment
+from utils.config import (
+    INFERENCE_BACKEND,
+    ZEROSHOT_MAX_LENGTH,
+    ZEROSHOT_MAX_CHARS,
+    ZEROSHOT_BATCH_TOKENS,
+    ZEROSHOT_MAX_BATCH_SIZE
+)
+from classifiers.batching import pad_batch, run_bucketed
+from classifiers.onnx_backend import EXPORT_EXAMPLE_TEXTS, load_onnx_session, weights_revision
+from classifiers.result_cache import classification_cache
+from classifiers.negative_news import negative_news_matcher
+from classifiers.aggregator import SentimentAggregator, average_sentiment_label
 import threading
-from typing import Dict, List
+from typing import Dict, List, Tuple
 # Set up basic logging for sync operations
 logging.basicConfig(level=logging.INFO)
 sync_logger = logging.getLogger(__name__)
 
-NEGATIVE_KEYWORDS = [
-    "fraud", "scam", "lawsuit", "corruption", "controversy",
-    "penalty", "fine", "arrest", "investigation", "illegal"
-]
+# Hypothesis paired with each candidate label (the zero-shot pipeline's default)
+HYPOTHESIS_TEMPLATE = "This example is {}."
 
 SENTIMENT_SCORES = {
     "positive": 1,
@@ -22,77 +33,179 @@ SENTIMENT_SCORES = {
 class ZeroShotSentimentProcessor:
     def __init__(self):
         self.classifier = None
+        self.tokenizer = None
+        self.onnx_session = None
+        self.weights_revision = None
+        self.backend = INFERENCE_BACKEND
+        self.model_name = "facebook/bart-large-mnli"
+        self.entailment_id = -1
         self.candidate_labels = ["positive", "negative", "neutral"]
         self._init_lock = threading.Lock()
         self._initialized = False
     
     def _ensure_classifier(self):
-        """Ensure classifier is initialized (thread-safe)"""
+        """Ensure tokenizer and NLI model are initialized (thread-safe)"""
         if not self._initialized:
             with self._init_lock:
                 if not self._initialized:  # Double-check pattern
                     try:
                         sync_logger.info(f"Initializing Zero-Shot classifier for thread: {threading.current_thread().name}")
-                        self.classifier = pipeline(
-                            "zero-shot-classification", 
-                            model="facebook/bart-large-mnli",
-                            device=-1,
-                            return_all_scores=True
+                        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+                        model.eval()  # CPU only
+                        self.entailment_id = next(
+                            (int(i) for i, label in model.config.id2label.items()
+                             if str(label).lower().startswith("entail")),
+                            -1
                         )
+                        self.weights_revision = weights_revision(self.model_name, model.config)
+                        if self.backend == "onnx":
+                            example = pad_batch(self._encode_pairs(EXPORT_EXAMPLE_TEXTS), self.tokenizer.pad_token_id or 0)
+                            self.onnx_session = load_onnx_session(self.model_name, model, example)
+                        # With an ONNX session the torch weights are not kept in memory
+                        self.classifier = self.onnx_session or model
                         self._initialized = True
                         sync_logger.info("Zero-Shot classifier initialized successfully")
                     except Exception as e:
                         sync_logger.error(f"Failed to initialize Zero-Shot classifier: {str(e)}")
                         self.classifier = None
 
-    def predict(self, text: str) -> str:
-        """Predict sentiment using zero-shot classification"""
-        if not text or not text.strip():
-            return "neutral"
-        
-        self._ensure_classifier()
+    def _run_model(self, input_ids: List[List[int]], attention_mask: List[List[int]]) -> np.ndarray:
+        """Forward pass over one padded batch of (premise, hypothesis) pairs, returning logits"""
+        if self.onnx_session is not None:
+            return self.onnx_session.run(input_ids, attention_mask)
+        with torch.no_grad():
+            outputs = self.classifier(
+                input_ids=torch.tensor(input_ids, dtype=torch.long),
+                attention_mask=torch.tensor(attention_mask, dtype=torch.long)
+            )
+        return outputs.logits.numpy()
+
+    def _entailment_logits(self, pairs: List[List[int]]) -> List[float]:
+        """Entailment logit of each pair in one batch"""
+        input_ids, attention_mask = pad_batch(pairs, self.tokenizer.pad_token_id or 0)
+        return self._run_model(input_ids, attention_mask)[:, self.entailment_id].tolist()
+
+    def _pair_templates(self) -> List[Tuple[List[int], List[int]]]:
+        """
+        (ids before the premise, ids after it) of the encoded pair of every
+        candidate hypothesis, read off the tokenizer's own pair encoding so
+        the model's special-token layout is kept.
+        """
+        probe = self.tokenizer(".", add_special_tokens=False)["input_ids"]
+        templates = []
+        for label in self.candidate_labels:
+            hypothesis = HYPOTHESIS_TEMPLATE.format(label)
+            empty = self.tokenizer("", hypothesis)["input_ids"]
+            probed = self.tokenizer(".", hypothesis)["input_ids"]
+            # The premise starts where the probe token shows up
+            start = next((k for k, (a, b) in enumerate(zip(empty, probed)) if a != b), len(empty))
+            if probed[start:start + len(probe)] != probe or len(probed) != len(empty) + len(probe):
+                raise ValueError(f"Unexpected pair encoding for hypothesis {hypothesis!r}")
+            templates.append((empty[:start], empty[start:]))
+        return templates
+
+    def _encode_pairs(self, texts: List[str]) -> List[List[int]]:
+        """
+        (premise, hypothesis) input ids for every text and candidate label,
+        the premise truncated so each pair fits ZEROSHOT_MAX_LENGTH tokens.
+        Each text is tokenized once (its first ZEROSHOT_MAX_CHARS characters)
+        and reused for every hypothesis.
+        """
+        templates = self._pair_templates()
+        premises = self.tokenizer(
+            [text[:ZEROSHOT_MAX_CHARS] for text in texts], add_special_tokens=False,
+            truncation=False, return_attention_mask=False, verbose=False
+        )["input_ids"]
+        return [
+            head + premise[:ZEROSHOT_MAX_LENGTH - len(head) - len(tail)] + tail
+            for premise in premises
+            for head, tail in templates
+        ]
+
+    def model_revision(self) -> str:
+        """Everything besides the text that changes the output: lexicon, weights, backend, labels and template"""
+        backend = os.path.basename(self.onnx_session.path) if self.onnx_session is not None else "torch"
+        return (f"{self.model_name}@{self.weights_revision}|{backend}|lexicon:{negative_news_matcher.version}|{ZEROSHOT_MAX_CHARS}/{ZEROSHOT_MAX_LENGTH}|"
+                f"{HYPOTHESIS_TEMPLATE}|{','.join(self.candidate_labels)}")
+
+    def _analyze_uncached(self, texts: List[str]) -> List[Dict]:
+        """
+        Zero-shot classify texts in one batched pass. Every text is paired
+        with one hypothesis per candidate label (the same template as the
+        zero-shot pipeline) and truncated to ZEROSHOT_MAX_LENGTH tokens; all
+        pairs run through the model in length-bucketed batches and each
+        text's label is the softmax over its entailment logits.
+        """
+        # One lexicon scan over the whole batch
+        categories = negative_news_matcher.match_batch(texts)
+
+        def fallback(error: str) -> List[Dict]:
+            return [{"label": "neutral", "confidence": 0.0, "scores": {},
+                     "negative_news_flag": bool(hits), "negative_news_categories": hits, "error": error}
+                    for hits in categories]
+
         if self.classifier is None:
             sync_logger.warning("Zero-Shot classifier not available, returning neutral")
-            return "neutral"
-        
-        max_length = 512
-        if len(text) > max_length:
-            text = text[:max_length]
-        
+            return fallback("classifier not available")
+
         try:
-            result = self.classifier(text, self.candidate_labels)
-            return result['labels'][0] if result and result.get('labels') else "neutral"
+            owners = [i for i, text in enumerate(texts) if text and text.strip()]
+            pairs = self._encode_pairs([texts[i] for i in owners]) if owners else []
+
+            logits = run_bucketed(
+                pairs, [len(ids) for ids in pairs], self._entailment_logits,
+                ZEROSHOT_BATCH_TOKENS, ZEROSHOT_MAX_BATCH_SIZE
+            )
+
+            results = [{"label": "neutral", "confidence": 0.0, "scores": {},
+                        "negative_news_flag": bool(hits), "negative_news_categories": hits}
+                       for hits in categories]
+            n_labels = len(self.candidate_labels)
+            for k, i in enumerate(owners):
+                scores = np.array(logits[k * n_labels:(k + 1) * n_labels])
+                probs = np.exp(scores - scores.max())
+                probs /= probs.sum()
+                best = int(probs.argmax())
+                results[i].update(
+                    label=self.candidate_labels[best],
+                    confidence=float(probs[best]),
+                    scores={label: float(p) for label, p in zip(self.candidate_labels, probs)}
+                )
+            return results
         except Exception as e:
-            sync_logger.error(f"Error in Zero-Shot sentiment prediction: {str(e)}")
-            return "neutral"
-    
-    def predict_batch(self, texts: List[str]) -> List[str]:
-        """Predict sentiment for multiple texts in batch"""
+            sync_logger.error(f"Error in batch Zero-Shot prediction: {str(e)}")
+            return fallback(str(e))
+
+    def analyze(self, texts: List[str]) -> List[Dict]:
+        """
+        Label, confidence, per-label scores, negative flag and per-category
+        negative-news hit counts of each text.
+        Texts classified before (same model revision and normalized text)
+        come from the classification cache; only the misses are scored.
+        """
         if not texts:
             return []
-        
         self._ensure_classifier()
-        if self.classifier is None:
-            return ["neutral"] * len(texts)
-        
-        # Truncate texts to max length
-        max_length = 512
-        processed_texts = [text[:max_length] if text and len(text) > max_length 
-                        else (text or "") for text in texts]
-        
-        try:
-            # Process all texts in a single batch
-            results = []
-            for text in processed_texts:
-                if not text.strip():
-                    results.append("neutral")
-                else:
-                    result = self.classifier(text, self.candidate_labels)
-                    results.append(result['labels'][0] if result and result.get('labels') else "neutral")
-            return results
-        except Exception as e:
-            sync_logger.error(f"Error in batch Zero-Shot prediction: {str(e)}")
-            return ["neutral"] * len(texts)
+        if classification_cache is None:
+            return self._analyze_uncached(texts)
+        return classification_cache.cached_analyze(
+            "zeroshot", self.model_revision(), texts, self._analyze_uncached
+        )
+
+    def predict_with_confidence(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """(label, confidence) of each text"""
+        return [(result["label"], result["confidence"]) for result in self.analyze(texts)]
+
+    def predict(self, text: str) -> str:
+        """Predict sentiment using zero-shot classification"""
+        if not text or not text.strip():
+            return "neutral"
+        return self.predict_with_confidence([text])[0][0]
+
+    def predict_batch(self, texts: List[str]) -> List[str]:
+        """Predict sentiment for multiple texts in batch"""
+        return [label for label, _ in self.predict_with_confidence(texts)]
 
     def process_news_batch(self, news_items: List[Dict]) -> List[Dict]:
         """Process multiple news items in batch"""
@@ -106,17 +219,18 @@ class ZeroShotSentimentProcessor:
             combined_text = f"{title}. {content}" if title else content
             texts.append(combined_text)
         
-        sentiments = self.predict_batch(texts)
+        analyses = self.analyze(texts)
         
         results = []
-        for i, (item, sentiment) in enumerate(zip(news_items, sentiments)):
+        for i, (item, analysis) in enumerate(zip(news_items, analyses)):
             try:
                 company = item.get('company')
                 title = item.get('title', '')
                 content = item.get('content', '')
-                combined_text = texts[i]
-                
-                negative_flag = self.flag_negative_news(combined_text)
+                sentiment = analysis["label"]
+                confidence = analysis["confidence"]
+                negative_flag = analysis["negative_news_flag"]
+                negative_categories = analysis.get("negative_news_categories", {})
                 
                 results.append({
                     "company_name": str(company) if company else "",
@@ -124,31 +238,20 @@ class ZeroShotSentimentProcessor:
                     "content": str(content),
                     "sentiment": sentiment,
                     "sentiment_score": SENTIMENT_SCORES.get(sentiment, 0),
-                    "negative_news_flag": negative_flag
+                    "sentiment_confidence": confidence,
+                    "negative_news_flag": negative_flag,
+                    "negative_news_categories": negative_categories
                 })
             except Exception as e:
                 sync_logger.error(f"Error processing news item {i}: {str(e)}")
-                continue
+                results.append(None)  # keep results aligned with news_items
         
         return results
 
 
-    def flag_negative_news(self, text: str) -> bool:
-        """Check if text contains negative keywords"""
-        if not text:
-            return False
-        
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in NEGATIVE_KEYWORDS)
-
     def average_sentiment_label(self, avg_score: float) -> str:
         """Convert average score to sentiment label matching the enum"""
-        if avg_score > 0.3:
-            return Sentiment.POSITIVE.value  # Returns "positive"
-        elif avg_score < -0.3:
-            return Sentiment.NEGATIVE.value  # Returns "negative"
-        else:
-            return Sentiment.NEUTRAL.value   # Returns "neutral"
+        return average_sentiment_label(avg_score)
 
     def process_news(self, content: str, title: str, company: str = None):
         """
@@ -162,8 +265,10 @@ class ZeroShotSentimentProcessor:
                 
             combined_text = f"{title}. {content}" if title else content
             
-            sentiment = self.predict(combined_text)
-            negative_flag = self.flag_negative_news(combined_text)
+            analysis = self.analyze([combined_text])[0]
+            sentiment, confidence = analysis["label"], analysis["confidence"]
+            negative_flag = analysis["negative_news_flag"]
+            negative_categories = analysis.get("negative_news_categories", {})
 
             return {
                 "company_name": str(company),
@@ -171,7 +276,9 @@ class ZeroShotSentimentProcessor:
                 "content": str(content) if content else "",
                 "sentiment": sentiment,
                 "sentiment_score": SENTIMENT_SCORES.get(sentiment, 0),
-                "negative_news_flag": negative_flag
+                "sentiment_confidence": confidence,
+                "negative_news_flag": negative_flag,
+                "negative_news_categories": negative_categories
             }
         except Exception as e:
             sync_logger.error(f"Error processing news for {company}: {str(e)}")
@@ -188,39 +295,13 @@ class ZeroShotSentimentProcessor:
             return []
         
         try:
-            company_sentiments = defaultdict(list)
-            company_negative_flags = defaultdict(bool)
-
-            for result in processed_results:
-                if not result or not result.get('company_name'):
-                    continue
-
-                company = result['company_name']
-                sentiment_score = result.get('sentiment_score', 0)
-                negative_flag = result.get('negative_news_flag', False)
-                
-                company_sentiments[company].append(sentiment_score)
-                company_negative_flags[company] = company_negative_flags[company] or negative_flag
-
-            summary = []
-            for company, scores in company_sentiments.items():
-                if not scores:
-                    continue
-                    
-                avg_score = sum(scores) / len(scores)
-                avg_sentiment = self.average_sentiment_label(avg_score)
-                negative_flag = company_negative_flags.get(company, False)
-
-                summary.append({
-                    "company_name": company,
-                    "average_sentiment": avg_sentiment,  # Returns enum value
-                    "negative_news_flag": negative_flag,
-                    "total_articles": len(scores)
-                })
+            aggregator = SentimentAggregator()
+            aggregator.add_all(processed_results)
+            summary = aggregator.snapshot()
 
             sync_logger.info(f"Generated Zero-Shot summary for {len(summary)} companies")
             return summary
-            
+
         except Exception as e:
             sync_logger.error(f"Error generating Zero-Shot summary: {str(e)}")
             return []
@@ -231,6 +312,8 @@ class ZeroShotSentimentProcessor:
             if self.classifier is not None:
                 # Clear the classifier
                 self.classifier = None
+                self.tokenizer = None
+                self.onnx_session = None
                 self._initialized = False
                 sync_logger.info(f"Cleaned up Zero-Shot classifier for thread: {threading.current_thread().name}")
         except Exception as e:
@@ -241,6 +324,7 @@ class ZeroShotSentimentProcessor:
         return {
             "initialized": self._initialized,
             "classifier_available": self.classifier is not None,
+            "backend": "onnx" if self.onnx_session is not None else "torch",
             "thread": threading.current_thread().name
         }
 
@@ -3,13 +3,40 @@ FastAPI application entry point
 """
 print("server may take time to start")
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, status
 from utils.async_logger import logger
+from utils.config import WARMUP_ENABLED
+from utils.readiness import READY, readiness
 from models.models import ScrapedRequest
-from process import scrape_and_analyze_news
+from process import scrape_and_analyze_news, start_warm_up
+from classifiers.runner import classification_scheduler
+from services.async_duck_duck_go import duck_duck_go_searcher
+from services.async_threadpool_simple_scraper import scraper
+from services.async_langchain import langchain_service
+from utils.threadpool import get_pool_metrics, shutdown_parse_pool
+from classifiers.result_cache import classification_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open and close long-lived clients with the application and warm up the models"""
+    await scraper.start()
+    warm_up_task = start_warm_up() if WARMUP_ENABLED else None
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    await classification_scheduler.close()
+    await scraper.close()
+    await duck_duck_go_searcher.close()
+    langchain_service.close()
+    if classification_cache is not None:
+        classification_cache.close()
+    shutdown_parse_pool()
+
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 logger.info("server loaded")
 
 
@@ -28,9 +55,23 @@ async def scrape_and_flag(request: ScrapedRequest):
 
 
 @app.get("/health", summary="Health Check Endpoint")
-async def health_check():
-    """Health check endpoint to verify API status"""
-    return {"status": "ok"}
+async def health_check(response: Response):
+    """Health check endpoint: 503 until the models are warm, with per-component readiness"""
+    state = readiness.state()
+    if state != READY:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ok" if state == READY else state,
+        "components": readiness.snapshot(),
+        "pools": get_pool_metrics(),
+        "batching": classification_scheduler.stats(),
+        "caches": {
+            "search": duck_duck_go_searcher.cache_stats(),
+            "llm": langchain_service.cache_stats(),
+            "pages": scraper.cache_stats(),
+            "classification": classification_cache.stats() if classification_cache is not None else {}
+        }
+    }
 
 
 if __name__ == "__main__":
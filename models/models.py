@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from utils.enums import Sentiment
 
 
@@ -12,6 +12,7 @@ class ScrapedCompanyDetail(BaseModel):
     average_sentiment: Sentiment
     negative_news_flag: bool
     total_articles: int
+    negative_news_categories: Optional[Dict[str, int]] = None
 
 
 class ScrapedResponse(BaseModel):
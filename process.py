@@ -9,58 +9,195 @@ from models.models import ScrapedRequest, ScrapedResponse, ScrapedCompanyDetail
 from utils.helper_functions import (
     generate_initial_search_queries,
     extract_urls_from_results,
+    extract_url_priorities,
+    dedupe_search_results,
+    build_url_company_index,
+    canonicalize_url,
     generate_follow_up_queries
 )
 from services.async_duck_duck_go import duck_duck_go_searcher
 from services.async_threadpool_simple_scraper import scraper
 from services.async_langchain import langchain_service
-from utils.config import CLASSIFIER_TYPE
-from utils.enums import ClassifierType, Sentiment
-from classifiers.finbert import finbert_classifier
-from classifiers.zeroshort import zeroshort_classifier
-from utils.threadpool import THREAD_POOL
-from typing import Dict, List
+from services.inference_client import inference_client
+from utils.config import (
+    LLM_EXTRACTION_WORKERS,
+    LLM_EXTRACTION_QUEUE_SIZE,
+    LLM_BATCH_ENABLED,
+    LLM_BATCH_MAX_DOCS,
+    LLM_BATCH_MAX_PASSAGE_CHARS,
+    PASSAGE_SELECTION_ENABLED,
+    COMPANY_CANONICALIZER,
+    WARMUP_OLLAMA,
+    INFERENCE_MODE,
+    INFERENCE_BATCHING_ENABLED,
+    NEWS_CLASSIFY_CHUNK_SIZE
+)
+from utils.passage_selector import select_passages
+from utils.company_names import canonicalize_companies
+from utils.enums import Sentiment, ScrapeStatus
+from classifiers.aggregator import SentimentAggregator
+from classifiers.runner import (
+    classify_sync,
+    batch_classify_sync,
+    warm_up_classifier_sync,
+    classification_scheduler
+)
+from utils.threadpool import THREAD_POOL, INFERENCE_METRICS, run_in_pool
+from utils.readiness import readiness
+from typing import Dict, List, Set
 
 
-def classify_sync(content: str, title: str, company: str):
-    """Synchronous classification function"""
-    try:
-        if CLASSIFIER_TYPE == ClassifierType.FINBERT:
-            print(f"Using FinBERT Sentiment Classification for {company}")
-            return finbert_classifier.process_news(content, title, company=company)
-        elif CLASSIFIER_TYPE == ClassifierType.ZEROSHORT:
-            print(f"Using Zero-Shot Sentiment Classification for {company}")
-            return zeroshort_classifier.process_news(content, title, company=company)
-        return None
-    except Exception as e:
-        print(f"Error in classification for {company}: {str(e)}")
-        return None
+async def classify_news_items(news_items: List[Dict]) -> List[Dict]:
+    """Classify news items through the inference server, the batching scheduler or THREAD_POOL"""
+    if INFERENCE_MODE == "server":
+        return await inference_client.process_news_batch(news_items)
+    if INFERENCE_BATCHING_ENABLED:
+        return await classification_scheduler.submit(news_items)
+    return await run_in_pool(THREAD_POOL, INFERENCE_METRICS, batch_classify_sync, news_items)
 
-def generate_summary_sync(processed_results):
-    """Synchronous summary generation function"""
-    try:
-        if CLASSIFIER_TYPE == ClassifierType.FINBERT:
-            print("Generating summary with FinBERT classifier")
-            return finbert_classifier.generate_summary(processed_results)
-        else:
-            print("Generating summary with Zero-Shot classifier")
-            return zeroshort_classifier.generate_summary(processed_results)
-    except Exception as e:
-        print(f"Error generating summary: {str(e)}")
-        return []
+
+def start_warm_up() -> asyncio.Task:
+    """
+    Preload the classifier and (optionally) the Ollama model in a background
+    task so the first request does not pay for model loading. Components
+    are registered as loading right away; their state and load times are
+    kept in the readiness registry, and only the classifier is required.
+    """
+    if INFERENCE_MODE == "server":
+        warm_classifier = inference_client.warm_up
+    else:
+        warm_classifier = lambda: run_in_pool(THREAD_POOL, INFERENCE_METRICS, warm_up_classifier_sync)
+    jobs = [("classifier", warm_classifier, True)]
+    if WARMUP_OLLAMA:
+        jobs.append(("ollama", langchain_service.warm_up, False))
+    for name, _, required in jobs:
+        readiness.start(name, required=required)
+
+    async def warm(name: str, job):
+        try:
+            await job()
+            readiness.ready(name)
+            logger.info(f"Warm-up of {name} finished")
+        except Exception as e:
+            readiness.failed(name, str(e))
+            logger.error(f"Warm-up of {name} failed: {str(e)}")
+
+    async def warm_all():
+        await asyncio.gather(*(warm(name, job) for name, job, _ in jobs))
+
+    return asyncio.create_task(warm_all())
 
 
 async def process_news_with_thread_pool(content: str, title: str, company: str):
     """Process news classification using thread pool"""
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(THREAD_POOL, classify_sync, content, title, company)
+    return await run_in_pool(THREAD_POOL, INFERENCE_METRICS, classify_sync, content, title, company)
+
 
 
+async def discover_companies(urls: List[str], priorities: Dict[str, int],
+                             request: ScrapedRequest) -> Set[str]:
+    """
+    Scrape the discovery URLs and extract company names with the LLM.
+    Pages go into a bounded queue drained by LLM_EXTRACTION_WORKERS
+    concurrent extraction workers, so scraping and LLM calls overlap.
+    Only passages around mentions of the person are sent to the LLM, and
+    pages that never mention them are skipped. Short passages that are
+    queued together are packed into one batched extraction call.
+    """
+    companies = set()
+    query = f"name is {request.name} and connected company is {request.company}"
+    queue: asyncio.Queue = asyncio.Queue(maxsize=LLM_EXTRACTION_QUEUE_SIZE)
+
+    def add_companies(output: str):
+        if output and output != "No companies found.":
+            found_companies = {
+                c.strip() for c in output.split(',')
+                if c.strip() and len(c.strip()) < 100
+            }
+            companies.update(found_companies)
+
+    async def next_pages():
+        """Wait for one page, then take whatever else is already queued (up to a batch)"""
+        pages = [await queue.get()]
+        max_pages = LLM_BATCH_MAX_DOCS if LLM_BATCH_ENABLED else 1
+        while len(pages) < max_pages and not queue.empty():
+            pages.append(queue.get_nowait())
+        # Keep a single shutdown sentinel and hand the rest back to other workers
+        for _ in range(pages.count(None) - 1):
+            queue.put_nowait(None)
+        return pages
+
+    async def extraction_worker():
+        while True:
+            pages = await next_pages()
+            contents = [page for page in pages if page is not None]
+            try:
+                if PASSAGE_SELECTION_ENABLED:
+                    contents = await asyncio.gather(*(
+                        asyncio.to_thread(select_passages, content, request.name)
+                        for content in contents
+                    ))
+                    contents = [content for content in contents if content]
+
+                short = [c for c in contents if len(c) <= LLM_BATCH_MAX_PASSAGE_CHARS]
+                long = [c for c in contents if len(c) > LLM_BATCH_MAX_PASSAGE_CHARS]
+                if LLM_BATCH_ENABLED and len(short) > 1:
+                    for output in await langchain_service.process_query_batch_async(query, short):
+                        add_companies(output)
+                else:
+                    long += short
+                for content in long:
+                    add_companies(await langchain_service.process_query_async(query, content))
+            except Exception as e:
+                logger.error(f"Company extraction failed: {str(e)}")
+            if None in pages:
+                return
+
+    workers = [
+        asyncio.create_task(extraction_worker())
+        for _ in range(LLM_EXTRACTION_WORKERS)
+    ]
+
+    async def enqueue(item):
+        """queue.put that gives up, instead of blocking forever, once no worker is left to drain the queue"""
+        put = asyncio.ensure_future(queue.put(item))
+        while not put.done():
+            alive = [worker for worker in workers if not worker.done()]
+            if not alive:
+                put.cancel()
+                raise RuntimeError("Company extraction workers stopped")
+            await asyncio.wait([put, *alive], return_when=asyncio.FIRST_COMPLETED)
 
-async def generate_summary_with_thread_pool(processed_results):
-    """Generate summary using thread pool"""
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(THREAD_POOL, generate_summary_sync, processed_results)
+    try:
+        async for result in scraper.scrape_urls_stream_immediate(urls, priorities):
+            if result['status'] in (ScrapeStatus.SUCCESS, ScrapeStatus.TRUNCATED):
+                content = result.get("content")
+                if content:
+                    await enqueue(content)
+        # One sentinel per worker once every page has been queued
+        for _ in workers:
+            await enqueue(None)
+        await asyncio.gather(*workers)
+    finally:
+        # Only left running when scraping or a worker failed
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return companies
+
+
+async def get_unique_companies(companies: List[str], request: ScrapedRequest) -> List[str]:
+    """Merge name variants and drop junk entries from the discovered companies"""
+    if COMPANY_CANONICALIZER == "llm":
+        unique_companies_str = await langchain_service.process_query_async_companies(
+            f"name is {request.name} and connected company is {request.company}", ", ".join(companies)
+        )
+        return [
+            c.strip() for c in unique_companies_str.split(',')
+            if c.strip()
+        ]
+    return canonicalize_companies(companies, person=request.name)
 
 
 async def scrape_and_analyze_news(request: ScrapedRequest):
@@ -75,117 +212,100 @@ async def scrape_and_analyze_news(request: ScrapedRequest):
         initial_search_queries = generate_initial_search_queries(request)
         search_results = []
 
-        for each in initial_search_queries:
-            search_results.extend(await duck_duck_go_searcher.search_text(each))
-            search_results.extend(await duck_duck_go_searcher.search_news(each))
+        for results in await duck_duck_go_searcher.search_all(initial_search_queries):
+            search_results.extend(results)
 
         search_results_urls = extract_urls_from_results(search_results)
         # logger.info(search_results_urls)
         logger.info(
             f"Found {len(search_results_urls)} URLs to scrape for company discovery.")
 
-        companies = set()
-        async for result in scraper.scrape_urls_stream_immediate(search_results_urls):
-            if result['status'] == 'success':
-                content = result.get("content")
-                if content:
-                    output = await langchain_service.process_query_async(initial_search_queries, content)
-                    print(output)
-                    if output and output != "No companies found.":
-                        found_companies = {
-                            c.strip() for c in output.split(',')
-                            if c.strip() and len(c.strip()) < 100
-                        }
-                        companies.update(found_companies)
-
-        # Get unique companies
-        companies_list = list(companies)
-        companies_str = ", ".join(companies_list)
-        unique_companies_str = await langchain_service.process_query_async_companies(
-            f"name is {request.name} and connected company is {request.company}", companies_str
+        companies = await discover_companies(
+            search_results_urls, extract_url_priorities(search_results), request
         )
 
-        # Convert to list
-        unique_companies = [
-            c.strip() for c in unique_companies_str.split(',')
-            if c.strip()
-        ]
+        # Get unique companies
+        unique_companies = await get_unique_companies(sorted(companies), request)
         logger.info(f"the unique companies found are : {unique_companies}")
         logger.info(f"no of unique companies found are : {len(unique_companies)}")
-        company_news_mapping = {}
+        company_news_mapping = {company: [] for company in unique_companies}
 
+        # Fan out every follow-up search for every company at once
+        follow_up_queries = []
         for company in unique_companies:
             logger.info(f"Found company: {company}")
-            company_queries = generate_follow_up_queries(company)
-            company_results = []
-
-            for query in company_queries:
-                results = await duck_duck_go_searcher.search_text(query)
-                results.extend(await duck_duck_go_searcher.search_news(query))
-                for result in results:
-                    result['company'] = company  # Tag each result with its company
-                company_results.extend(results)
+            for query in generate_follow_up_queries(company):
+                follow_up_queries.append((company, query))
 
-            company_news_mapping[company] = company_results
+        follow_up_results = await duck_duck_go_searcher.search_all(
+            [query for _, query in follow_up_queries]
+        )
+        for (company, _), results in zip(follow_up_queries, follow_up_results):
+            for result in results:
+                result['company'] = company  # Tag each result with its company
+            company_news_mapping[company].extend(results)
 
         # Collect all news results
         news_search_results = []
         for results in company_news_mapping.values():
             news_search_results.extend(results)
 
-        logger.info(f"Found {len(news_search_results)} news articles to scrape.")
-        news_search_urls = extract_urls_from_results(news_search_results)
-
-        # Collect all news data first for batch processing
-        news_items = []
-
-        async for result in scraper.scrape_urls_stream_immediate(news_search_urls):
-            if result['status'] == 'success':
-                content = result.get("content")
-                title = result.get("title")
-                url = result.get("url")
-                company = None
-
-                # Find associated company
-                for comp, results_list in company_news_mapping.items():
-                    for news_item in results_list:
-                        item_url = (
-                            news_item.get('href') or
-                            news_item.get('link') or
-                            news_item.get('url')
-                        )
-                        if item_url == url:
-                            company = comp
-                            break
-                    if company:
-                        break
-
-                if content and title and company:
-                    news_items.append({
-                        'title': title,
-                        'content': content,
-                        'company': company
-                    })
-
-        logger.info(f"Processing {len(news_items)} articles in batch")
-        
-        async def process_batch():
-            loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(
-                THREAD_POOL, 
-                batch_classify_sync, 
-                news_items
-            )
-        
-        processed_results = await process_batch()
-
-        valid_processed_results = [
-            result for result in processed_results 
-            if result is not None
-        ]
-
-        # Generate summary
-        summary = await generate_summary_with_thread_pool(valid_processed_results)
+        # Same article from several queries or companies is fetched once
+        unique_news_results = dedupe_search_results(news_search_results)
+        logger.info(
+            f"Found {len(news_search_results)} news results, "
+            f"{len(unique_news_results)} unique articles to scrape.")
+        news_search_urls = extract_urls_from_results(unique_news_results)
+        url_company_index = build_url_company_index(unique_news_results)
+
+        # Articles go to classification in chunks while scraping continues;
+        # results feed a running per-company aggregate
+        aggregator = SentimentAggregator()
+        classification_tasks = []
+        chunk = []
+
+        async def classify_chunk(items: List[Dict]):
+            processed_results = await classify_news_items(items)
+            # A chunk with missing results fails the request rather than shrinking the summary
+            if len(processed_results) != len(items) or any(result is None for result in processed_results):
+                failed = len(items) - sum(result is not None for result in processed_results)
+                raise RuntimeError(f"Classification failed for {failed} of {len(items)} news items")
+            # Each article was classified once; attribute it to all of its companies
+            for item, result in zip(items, processed_results):
+                for company in item['companies']:
+                    aggregator.add(result, company=company)
+
+        try:
+            async for result in scraper.scrape_urls_stream_immediate(
+                news_search_urls, extract_url_priorities(news_search_results)
+            ):
+                if result['status'] in (ScrapeStatus.SUCCESS, ScrapeStatus.TRUNCATED):
+                    content = result.get("content")
+                    title = result.get("title")
+                    url = result.get("url")
+                    companies = url_company_index.get(canonicalize_url(url)) if url else None
+
+                    if content and title and companies:
+                        chunk.append({
+                            'title': title,
+                            'content': content,
+                            'company': companies[0],
+                            'companies': companies
+                        })
+                        if len(chunk) >= NEWS_CLASSIFY_CHUNK_SIZE:
+                            classification_tasks.append(asyncio.create_task(classify_chunk(chunk)))
+                            chunk = []
+
+            if chunk:
+                classification_tasks.append(asyncio.create_task(classify_chunk(chunk)))
+            await asyncio.gather(*classification_tasks)
+        finally:
+            for task in classification_tasks:
+                task.cancel()
+            await asyncio.gather(*classification_tasks, return_exceptions=True)
+        logger.info(f"Classified {aggregator.articles} company-article pairs")
+
+        summary = aggregator.snapshot()
 
         response_data = []
         for item in summary:
@@ -193,7 +313,8 @@ async def scrape_and_analyze_news(request: ScrapedRequest):
                 name=item["company_name"],
                 average_sentiment=Sentiment(item["average_sentiment"]),
                 negative_news_flag=item["negative_news_flag"],
-                total_articles=item["total_articles"]
+                total_articles=item["total_articles"],
+                negative_news_categories=item["negative_news_categories"]
             ))
 
         execution_time = time.time() - start_time
@@ -204,17 +325,3 @@ async def scrape_and_analyze_news(request: ScrapedRequest):
     except Exception as e:
         logger.error(f"Error occurred during processing: {str(e)}")
         return ScrapedResponse(result=[])
-
-def batch_classify_sync(news_items: List[Dict]):
-    """Synchronous batch classification function"""
-    try:
-        if CLASSIFIER_TYPE == ClassifierType.ZEROSHORT:
-            print(f"Using Zero-Shot Batch Sentiment Classification for {len(news_items)} items")
-            return zeroshort_classifier.process_news_batch(news_items)
-        elif CLASSIFIER_TYPE == ClassifierType.FINBERT:
-            print(f"Using FinBERT Batch Sentiment Classification for {len(news_items)} items")
-            return finbert_classifier.process_news_batch(news_items)
-        return []
-    except Exception as e:
-        print(f"Error in batch classification: {str(e)}")
-        return []
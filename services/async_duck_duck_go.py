@@ -1,22 +1,118 @@
+import asyncio
+import json
 from asyncddgs import aDDGS
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from aiohttp.client_exceptions import ClientError
+from utils.cache_store import SQLiteCache, hash_key
+from utils.config import (
+    SEARCH_CONCURRENCY,
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTLS
+)
+
+
+class SearchResultCache:
+    """
+    Disk-backed cache of search results.
+    Entries expire after a per-method TTL and the least recently used
+    entries are evicted once the store grows past max_entries.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttls: Dict[str, int] = None,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.ttls = ttls if ttls is not None else SEARCH_CACHE_TTLS
+        self.store = SQLiteCache(path, "search_results", max_entries)
+
+    @staticmethod
+    def make_key(method: str, query: str, region: str, safesearch: str, max_results: int) -> str:
+        return hash_key(method, query, region, safesearch, max_results)
+
+    def get(self, method: str, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results if present and still fresh"""
+        value = self.store.get(key, ttl=self.ttls.get(method, 0))
+        return json.loads(value) if value is not None else None
+
+    def set(self, method: str, key: str, results: List[Dict[str, Any]]) -> None:
+        self.store.set(key, json.dumps(results))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+    def close(self) -> None:
+        self.store.close()
 
 
 class DuckDuckGoAsyncSearcher:
     """
     using the async version of the free search tool,
     this class provides methods to search for various content types.
+    A single aDDGS client is shared by all searches and reused until close().
     """
 
-    def __init__(self, region: str = "us-en", safesearch: str = "moderate"):
+    def __init__(self, region: str = "us-en", safesearch: str = "moderate",
+                 max_concurrency: int = SEARCH_CONCURRENCY,
+                 cache: Optional[SearchResultCache] = None):
         self.region = region
         self.safesearch = safesearch
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._client: Optional[aDDGS] = None
+        self._client_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get_client(self) -> aDDGS:
+        """Return the shared aDDGS client, opening it on first use"""
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self._client is None:
+                client = aDDGS()
+                await client.__aenter__()
+                self._client = client
+            return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def close(self) -> None:
+        """Close the shared aDDGS client and the result cache"""
+        if self.cache is not None:
+            self.cache.close()
+        if self._client is not None:
+            client, self._client = self._client, None
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as e:
+                logging.error(f"Error closing DuckDuckGo client: {str(e)}")
 
     async def _fetch_results(self, method: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        if self.cache is None:
+            return await self._search(method, query, max_results)
+
+        key = self.cache.make_key(method, query, self.region, self.safesearch, max_results)
+        # SQLite reads and writes block, so they run off the event loop
+        cached = await asyncio.to_thread(self.cache.get, method, key)
+        if cached is not None:
+            return cached
+
+        results = await self._search(method, query, max_results)
+        # Empty lists are also what errors return, so they are never cached
+        if results:
+            await asyncio.to_thread(self.cache.set, method, key, results)
+        return results
+
+    async def _search(self, method: str, query: str, max_results: int) -> List[Dict[str, Any]]:
         try:
-            async with aDDGS() as client:
+            async with self._get_semaphore():
+                client = await self._get_client()
                 try:
                     search_method = getattr(client, method)
                     results = await search_method(
@@ -25,7 +121,7 @@ class DuckDuckGoAsyncSearcher:
                         safesearch=self.safesearch,
                         max_results=max_results
                     )
-                    return results
+                    return results or []
                 except AttributeError as e:
                     logging.error(
                         f"Invalid search method '{method}': {str(e)}")
@@ -45,5 +141,27 @@ class DuckDuckGoAsyncSearcher:
     async def search_news(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         return await self._fetch_results("news", query, max_results)
 
+    async def search_all(self, queries: List[str], max_results: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Run text and news searches for every query concurrently.
+        Returns one list per query (text results followed by news results),
+        in the same order as the queries.
+        """
+        if not queries:
+            return []
+
+        tasks = []
+        for query in queries:
+            tasks.append(self.search_text(query, max_results))
+            tasks.append(self.search_news(query, max_results))
+
+        results = await asyncio.gather(*tasks)
+        return [
+            list(results[i]) + list(results[i + 1])
+            for i in range(0, len(results), 2)
+        ]
+
 
-duck_duck_go_searcher = DuckDuckGoAsyncSearcher()
+duck_duck_go_searcher = DuckDuckGoAsyncSearcher(
+    cache=SearchResultCache() if SEARCH_CACHE_ENABLED else None
+)
@@ -1,36 +1,66 @@
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, Optional
 from langchain.prompts import PromptTemplate
 from langchain_ollama import OllamaLLM
 from langchain_core.output_parsers import StrOutputParser
+from utils.cache_store import SQLiteCache, hash_key
+from utils.config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES
+
+
+EXTRACTION_ROLE = (
+    "You are an expert financial analyst specializing in identifying verified business relationships between high-net-worth individuals and companies.\n\n"
+)
+
+# Rules 1-5 of the extraction prompt, shared by the single and batched variants
+EXTRACTION_RULES = (
+    "1. RELEVANCE CHECK: First verify this text discusses the specific person mentioned in the QUERY.\n"
+    "2. EVIDENCE REQUIREMENT: Extract company names ONLY when the text provides EXPLICIT evidence of:\n"
+    "   • Ownership (founder, co-founder, owner, shareholder, stake holder)\n"
+    "   • Executive leadership (CEO, Chairman, President, Managing Director, CTO, CFO)\n"
+    "   • Board positions (Board member, Director, Board Chairman)\n"
+    "   • Control relationships (subsidiary ownership, parent company control)\n"
+    "   • Business partnerships (joint ventures, business partners, co-investors)\n"
+    "   • Investment relationships (investor, backed by, funded by)\n\n"
+    "3. EXCLUSION CRITERIA - Do NOT include companies if:\n"
+    "   • Person is only mentioned as a customer, user, or client\n"
+    "   • Company is mentioned in passing without connection details\n"
+    "   • Person is only an employee without leadership role\n"
+    "   • Connection is speculative, rumored, or unconfirmed\n"
+    "   • Text only mentions industry competitors or market comparisons\n"
+    "   • Historical mentions without current relevance\n\n"
+    "4. VERIFICATION: For each company, ensure there's a clear sentence or phrase establishing the connection.\n\n"
+    "5. FORMATTING: Use complete, formal company names (include 'Inc', 'Ltd', 'Corporation', 'Limited' when mentioned).\n\n"
+)
+
+NO_COMPANIES = "No companies found."
+BATCH_DOCUMENT_HEADER = "=== DOCUMENT {index} ==="
+BATCH_OUTPUT_LINE_RE = re.compile(r"^\W*DOCUMENT\s+(\d+)\W*?[:\-–]\s*(.*?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def template_version(template: PromptTemplate) -> str:
+    """Short hash of a prompt's text, so editing a prompt invalidates its cache entries"""
+    return hashlib.sha256(template.template.encode("utf-8")).hexdigest()[:12]
+
 
 class LangChainAsyncService:
-    def __init__(self, model: str = "mistral:latest", temperature: float = 0.0) -> None:
+    def __init__(self, model: str = "mistral:latest", temperature: float = 0.0,
+                 cache: Optional[SQLiteCache] = None) -> None:
+        self.model = model
+        self.temperature = temperature
+        self.cache = cache
         self.llm = OllamaLLM(model=model, temperature=temperature)
 
         # Extraction prompt
         self.prompt_template = PromptTemplate(
             input_variables=["query", "text"],
             template=(
-                "You are an expert financial analyst specializing in identifying verified business relationships between high-net-worth individuals and companies.\n\n"
+                EXTRACTION_ROLE +
                 "QUERY (Target person and context): {query}\n\n"
                 "TEXT TO ANALYZE:\n{text}\n\n"
-                "INSTRUCTIONS:\n"
-                "1. RELEVANCE CHECK: First verify this text discusses the specific person mentioned in the QUERY.\n"
-                "2. EVIDENCE REQUIREMENT: Extract company names ONLY when the text provides EXPLICIT evidence of:\n"
-                "   • Ownership (founder, co-founder, owner, shareholder, stake holder)\n"
-                "   • Executive leadership (CEO, Chairman, President, Managing Director, CTO, CFO)\n"
-                "   • Board positions (Board member, Director, Board Chairman)\n"
-                "   • Control relationships (subsidiary ownership, parent company control)\n"
-                "   • Business partnerships (joint ventures, business partners, co-investors)\n"
-                "   • Investment relationships (investor, backed by, funded by)\n\n"
-                "3. EXCLUSION CRITERIA - Do NOT include companies if:\n"
-                "   • Person is only mentioned as a customer, user, or client\n"
-                "   • Company is mentioned in passing without connection details\n"
-                "   • Person is only an employee without leadership role\n"
-                "   • Connection is speculative, rumored, or unconfirmed\n"
-                "   • Text only mentions industry competitors or market comparisons\n"
-                "   • Historical mentions without current relevance\n\n"
-                "4. VERIFICATION: For each company, ensure there's a clear sentence or phrase establishing the connection.\n\n"
-                "5. FORMATTING: Use complete, formal company names (include 'Inc', 'Ltd', 'Corporation', 'Limited' when mentioned).\n\n"
+                "INSTRUCTIONS:\n" +
+                EXTRACTION_RULES +
                 "6. OUTPUT FORMAT:\n"
                 "   • If companies found: Comma-separated list only (no bullets, numbers, or explanations)\n"
                 "   • If no qualifying companies: Exactly 'No companies found.'\n\n"
@@ -41,6 +71,26 @@ class LangChainAsyncService:
             ),
         )
 
+        # Multi-document extraction prompt: the instructions are paid once per batch
+        self.batch_prompt_template = PromptTemplate(
+            input_variables=["query", "documents"],
+            template=(
+                EXTRACTION_ROLE +
+                "QUERY (Target person and context): {query}\n\n"
+                "DOCUMENTS TO ANALYZE (each one separately):\n{documents}\n\n"
+                "INSTRUCTIONS (apply to each document independently):\n" +
+                EXTRACTION_RULES +
+                "6. OUTPUT FORMAT:\n"
+                "   • Exactly one line per document, in order, starting with 'DOCUMENT <number>:'\n"
+                "   • After the colon: comma-separated company list only, or exactly 'No companies found.'\n"
+                "   • No other text before, between or after the lines\n\n"
+                "EXAMPLE:\n"
+                "DOCUMENT 1: Tesla Inc, SpaceX\n"
+                "DOCUMENT 2: No companies found.\n\n"
+                "OUTPUT:\n"
+            ),
+        )
+
         # Deduplication/cleanup prompt
         self.unique_companies_template = PromptTemplate(
             input_variables=["query", "text"],
@@ -81,24 +131,103 @@ class LangChainAsyncService:
 
 
         self.chain = self.prompt_template | self.llm | StrOutputParser()
+        self.batch_chain = self.batch_prompt_template | self.llm | StrOutputParser()
         self.companies_chain = self.unique_companies_template | self.llm | StrOutputParser()
 
+    def _cache_key(self, template: PromptTemplate, inputs: Dict[str, str]) -> str:
+        return hash_key(self.model, self.temperature, template_version(template), inputs)
+
+    def _batch_cache_key(self, query: str, text: str) -> str:
+        """Key of one text's line of a batched answer; kept apart from single-prompt outputs"""
+        return self._cache_key(self.batch_prompt_template, {"query": query, "text": text})
+
+    async def _cached_invoke(self, chain, template: PromptTemplate, inputs: Dict[str, str]) -> str:
+        """Invoke a chain, reusing the stored output for identical inputs"""
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(template, inputs)
+            # SQLite reads and writes block, so they run off the event loop
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        result = (await chain.ainvoke(inputs)).strip()
+        # Only successful outputs reach this point; fallbacks are never cached
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, result)
+        return result
+
     async def process_query_async(self, query: str, text: str) -> str:
         """Extract company names from raw text."""
         try:
-            result = await self.chain.ainvoke({"query": query, "text": text})
-            return result.strip()
+            return await self._cached_invoke(
+                self.chain, self.prompt_template, {"query": query, "text": text}
+            )
         except Exception as e:
             print(f"Error in process_query_async: {str(e)}")
             return "No companies found."
 
+    async def process_query_batch_async(self, query: str, texts: List[str]) -> List[str]:
+        """
+        Extract company names from several short texts with one LLM call.
+        Each text's line is cached under a key of the batch prompt, apart
+        from single-document outputs; texts whose line is missing from the
+        batched output fall back to single-document calls.
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            cached = None
+            if self.cache is not None:
+                cached = await asyncio.to_thread(self.cache.get, self._batch_cache_key(query, text))
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+
+        if len(misses) > 1:
+            documents = "\n\n".join(
+                f"{BATCH_DOCUMENT_HEADER.format(index=n)}\n{texts[i]}"
+                for n, i in enumerate(misses, start=1)
+            )
+            try:
+                output = await self.batch_chain.ainvoke({"query": query, "documents": documents})
+                parsed = {int(n): line for n, line in BATCH_OUTPUT_LINE_RE.findall(output)}
+                for n, i in enumerate(misses, start=1):
+                    line = parsed.get(n)
+                    if line:
+                        results[i] = line
+                        if self.cache is not None:
+                            await asyncio.to_thread(self.cache.set, self._batch_cache_key(query, texts[i]), line)
+            except Exception as e:
+                print(f"Error in process_query_batch_async: {str(e)}")
+
+        for i in misses:
+            if results[i] is None:
+                results[i] = await self.process_query_async(query, texts[i])
+        return results
+
     async def process_query_async_companies(self, query: str, text: str) -> str:
         """Deduplicate/clean a company list."""
         try:
-            result = await self.companies_chain.ainvoke({"query": query, "text": text})
-            return result.strip()
+            return await self._cached_invoke(
+                self.companies_chain, self.unique_companies_template, {"query": query, "text": text}
+            )
         except Exception as e:
             print(f"Error in process_query_async_companies: {str(e)}")
             return text  # Fallback to original list
 
-langchain_service = LangChainAsyncService()
+    async def warm_up(self) -> None:
+        """Make the Ollama server load the model with a tiny uncached prompt"""
+        await self.llm.ainvoke("Reply with OK.")
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.close()
+
+langchain_service = LangChainAsyncService(
+    cache=SQLiteCache(LLM_CACHE_PATH, "llm_responses", LLM_CACHE_MAX_ENTRIES) if LLM_CACHE_ENABLED else None
+)
@@ -1,22 +1,111 @@
 import asyncio
-from aiohttp import ClientSession
-from bs4 import BeautifulSoup
-from typing import Dict, List, AsyncGenerator, Tuple
-from utils.threadpool import THREAD_POOL
+from aiohttp import ClientSession, TCPConnector
+from typing import Dict, List, AsyncGenerator, Optional, Tuple
+from utils.threadpool import run_in_parse_pool
+from utils.enums import ScrapeStatus
+from utils.config import (
+    PAGE_CACHE_ENABLED,
+    HTML_EXTRACTOR,
+    HTML_MAIN_CONTENT_ONLY,
+    SCRAPER_STREAM_BODY,
+    SCRAPER_MAX_BODY_BYTES,
+    SCRAPER_READ_CHUNK_SIZE,
+    SCRAPER_ALLOWED_CONTENT_TYPES,
+    SCRAPER_CONNECTION_LIMIT,
+    SCRAPER_CONNECTION_LIMIT_PER_HOST,
+    SCRAPER_DNS_CACHE_TTL,
+    SCRAPER_KEEPALIVE_TIMEOUT
+)
+from services.page_cache import PageCache, content_hash
+from services.fetch_scheduler import FetchScheduler, fetch_scheduler
+from services.html_extractors import extract_page
 
 
 class AsyncWebScraper:
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, page_cache: Optional[PageCache] = None,
+                 scheduler: FetchScheduler = fetch_scheduler,
+                 stream_body: bool = SCRAPER_STREAM_BODY,
+                 max_body_bytes: int = SCRAPER_MAX_BODY_BYTES,
+                 extractor_name: str = HTML_EXTRACTOR,
+                 main_content_only: bool = HTML_MAIN_CONTENT_ONLY):
         self.timeout = timeout
+        self.extractor_name = extractor_name
+        self.main_content_only = main_content_only
+        self.page_cache = page_cache
+        self.scheduler = scheduler
+        self.stream_body = stream_body
+        self.max_body_bytes = max_body_bytes
+        self._session: Optional[ClientSession] = None
 
-    async def _fetch_html(self, session: ClientSession, url: str) -> Tuple[str, str]:
-        """Fetch HTML and return (html, url) tuple"""
+    async def start(self) -> None:
+        """Open the pooled HTTP session shared by every scrape"""
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=SCRAPER_CONNECTION_LIMIT,
+                limit_per_host=SCRAPER_CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=SCRAPER_DNS_CACHE_TTL,
+                keepalive_timeout=SCRAPER_KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True
+            )
+            self._session = ClientSession(
+                connector=connector,
+                headers={'User-Agent': 'Mozilla/5.0'}
+            )
+
+    def cache_stats(self) -> Dict:
+        return self.page_cache.stats() if self.page_cache is not None else {}
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session and the page cache"""
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+        if self.page_cache is not None:
+            self.page_cache.close()
+
+    async def _get_session(self) -> ClientSession:
+        # Opened lazily when the scraper is used outside the app lifespan
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _fetch_html(self, session: ClientSession, url: str,
+                          headers: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Fetch HTML and return a dict with the raw body bytes, the charset of
+        the Content-Type header (None when absent, so the parser sniffs it)
+        and the cache validators. A 304 answer to a conditional request
+        comes back with body=None.
+        In streaming mode the Content-Type is checked before the body is
+        read: other types come back with body=None and a skip_reason, and
+        bodies over max_body_bytes are cut off and flagged as truncated.
+        """
         try:
-            async with session.get(url, timeout=self.timeout) as resp:
+            async with session.get(url, timeout=self.timeout, headers=headers) as resp:
                 try:
-                    resp.raise_for_status()
-                    html = await resp.text()
-                    return html, url
+                    body = None
+                    truncated = False
+                    skip_reason = None
+                    if resp.status != 304:
+                        resp.raise_for_status()
+                        if not self.stream_body:
+                            body = await resp.read()
+                        else:
+                            mime = resp.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                            if mime and mime not in SCRAPER_ALLOWED_CONTENT_TYPES:
+                                skip_reason = f"Unsupported content type: {mime}"
+                            else:
+                                body, truncated = await self._read_body(resp)
+                    return {
+                        'url': url,
+                        'status_code': resp.status,
+                        'body': body,
+                        'encoding': resp.charset,
+                        'truncated': truncated,
+                        'skip_reason': skip_reason,
+                        'etag': resp.headers.get('ETag'),
+                        'last_modified': resp.headers.get('Last-Modified')
+                    }
                 except Exception as e:
                     raise Exception(f"Failed to read response: {str(e)}")
         except asyncio.TimeoutError:
@@ -24,43 +113,123 @@ class AsyncWebScraper:
         except Exception as e:
             raise Exception(f"Failed to fetch URL {url}: {str(e)}")
 
-    def _parse_html(self, html: str, url: str) -> Dict:
-        """Parse HTML in thread pool"""
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
+    async def _read_body(self, resp) -> Tuple[bytes, bool]:
+        """Read the body incrementally, stopping at max_body_bytes"""
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(SCRAPER_READ_CHUNK_SIZE):
+            remaining = self.max_body_bytes - size
+            if len(chunk) > remaining:
+                chunks.append(chunk[:remaining])
+                return b''.join(chunks), True
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks), False
 
-            # Remove scripts and styles
-            try:
-                for script in soup(["script", "style"]):
-                    script.extract()
-            except Exception as e:
-                raise Exception(f"Failed to clean HTML: {str(e)}")
+    @staticmethod
+    def _skipped_result(url: str, reason: str) -> Dict:
+        return {
+            'url': url,
+            'title': None,
+            'content': None,
+            'status': ScrapeStatus.SKIPPED.value,
+            'error': reason
+        }
 
-            try:
-                text = soup.get_text()
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip()
-                          for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
-
-                return {
-                    'url': url,
-                    'title': soup.title.string if soup.title else 'No title',
-                    'content': text,
-                    'status': 'success',
-                    'length': len(text)
-                }
-            except Exception as e:
-                raise Exception(f"Failed to extract text: {str(e)}")
+    async def _parse_html(self, fetched: Dict) -> Dict:
+        """Parse fetched HTML bytes in the parse pool"""
+        url = fetched['url']
+        try:
+            extracted = await run_in_parse_pool(
+                extract_page, fetched['body'], fetched['encoding'],
+                self.extractor_name, self.main_content_only
+            )
         except Exception as e:
             raise Exception(f"Failed to parse HTML from {url}: {str(e)}")
 
-    async def _process_fetch_result(self, fetch_task, loop):
-        """Process a single fetch result through the thread pool"""
+        text = extracted['content'] or ''
+        result = {
+            'url': url,
+            'title': extracted['title'],
+            'content': text,
+            'status': ScrapeStatus.SUCCESS.value,
+            'length': len(text)
+        }
+        if fetched['truncated']:
+            result['status'] = ScrapeStatus.TRUNCATED.value
+            result['truncated'] = True
+        return result
+
+    @staticmethod
+    def _cached_result(url: str, entry: Dict) -> Dict:
+        content = entry.get('content') or ''
+        return {
+            'url': url,
+            'title': entry.get('title'),
+            'content': content,
+            'status': ScrapeStatus.SUCCESS.value,
+            'length': len(content),
+            'cached': True
+        }
+
+    async def _fetch_and_parse(self, session: ClientSession, url: str) -> Dict:
+        """
+        Fetch and parse one URL, serving it from the page cache when possible.
+        Fresh entries skip the network; stale ones are revalidated with
+        ETag/Last-Modified and skip parsing when the body is unchanged.
+        """
+        entry = None
+        if self.page_cache is not None:
+            entry = await asyncio.to_thread(self.page_cache.get, url)
+            if entry and entry['fresh']:
+                await asyncio.to_thread(self.page_cache.touch, url)
+                return self._cached_result(url, entry)
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        fetched = await self._fetch_html(session, url, headers=headers or None)
+        body = fetched['body']
+
+        if entry and fetched['status_code'] == 304:
+            await asyncio.to_thread(
+                self.page_cache.touch, url, True, fetched['etag'], fetched['last_modified']
+            )
+            return self._cached_result(url, entry)
+
+        if fetched['skip_reason']:
+            return self._skipped_result(url, fetched['skip_reason'])
+        if body is None:
+            raise Exception(f"Empty response for {url}")
+
+        html_hash = content_hash(body)
+        if entry and entry.get('html_hash') == html_hash:
+            await asyncio.to_thread(
+                self.page_cache.touch, url, True, fetched['etag'], fetched['last_modified']
+            )
+            return self._cached_result(url, entry)
+
+        result = await self._parse_html(fetched)
+        # Partial pages are reported but not cached, so a later fetch can complete them
+        if self.page_cache is not None and not fetched['truncated']:
+            await asyncio.to_thread(
+                self.page_cache.put, url, result, body, html_hash,
+                fetched['etag'], fetched['last_modified']
+            )
+        return result
+
+    async def _process_fetch_result(self, fetch_task):
+        """Process a single fetch result through the parse pool"""
         try:
-            html, url = await fetch_task
-            # Immediately pass to thread pool
-            return await loop.run_in_executor(THREAD_POOL, self._parse_html, html, url)
+            fetched = await fetch_task
+            if fetched['skip_reason']:
+                return self._skipped_result(fetched['url'], fetched['skip_reason'])
+            # Immediately pass to the parse pool
+            return await self._parse_html(fetched)
         except Exception as e:
             # Extract URL from the task for error reporting
             url = "unknown"
@@ -68,7 +237,7 @@ class AsyncWebScraper:
                 'url': url,
                 'title': None,
                 'content': None,
-                'status': 'failed',
+                'status': ScrapeStatus.FAILED.value,
                 'error': str(e)
             }
 
@@ -77,95 +246,76 @@ class AsyncWebScraper:
         Pipeline approach: Fetch -> Parse -> Yield
         Each step happens as soon as the previous completes
         """
-        async with ClientSession(headers={'User-Agent': 'Mozilla/5.0'}) as session:
-            loop = asyncio.get_running_loop()
-
-            # Start all fetch operations
-            fetch_tasks = [
-                asyncio.create_task(self._fetch_html(session, url))
-                for url in urls
-            ]
-
-            # Process fetch results as they complete
-            processing_tasks = []
-
-            for completed_fetch in asyncio.as_completed(fetch_tasks):
-                # As soon as fetch completes, start parsing in thread pool
-                processing_task = asyncio.create_task(
-                    self._process_fetch_result(completed_fetch, loop)
-                )
-                processing_tasks.append(processing_task)
-
-            # Yield parsing results as they complete
-            for completed_processing in asyncio.as_completed(processing_tasks):
-                result = await completed_processing
-                yield result
-
-    async def scrape_urls_stream_immediate(self, urls: List[str]) -> AsyncGenerator[Dict, None]:
+        session = await self._get_session()
+
+        # Start all fetch operations
+        fetch_tasks = [
+            asyncio.create_task(self._fetch_html(session, url))
+            for url in urls
+        ]
+
+        # Process fetch results as they complete
+        processing_tasks = []
+
+        for completed_fetch in asyncio.as_completed(fetch_tasks):
+            # As soon as fetch completes, start parsing in the parse pool
+            processing_task = asyncio.create_task(
+                self._process_fetch_result(completed_fetch)
+            )
+            processing_tasks.append(processing_task)
+
+        # Yield parsing results as they complete
+        for completed_processing in asyncio.as_completed(processing_tasks):
+            result = await completed_processing
+            yield result
+
+    async def scrape_urls_stream_immediate(self, urls: List[str],
+                                           priorities: Optional[Dict[str, int]] = None
+                                           ) -> AsyncGenerator[Dict, None]:
         """
-        Even more immediate approach: Start parsing as soon as each fetch completes
+        Even more immediate approach: Start parsing as soon as each fetch completes.
+        Fetches go through the scheduler, so only a bounded number of URLs
+        (and of parses) are in flight at once; lower priority values go first.
         """
         if not urls:
             return
 
         try:
-            async with ClientSession(headers={'User-Agent': 'Mozilla/5.0'}) as session:
-                loop = asyncio.get_running_loop()
-
-                async def fetch_and_parse(url: str):
-                    """Fetch URL and parse in one go"""
-                    try:
-                        if not url or not isinstance(url, str):
-                            raise ValueError(f"Invalid URL: {url}")
-
-                        html, fetched_url = await self._fetch_html(session, url)
-                        # Parse in thread pool
-                        return await loop.run_in_executor(
-                            THREAD_POOL, self._parse_html, html, fetched_url
-                        )
-                    except Exception as e:
-                        return {
-                            'url': url,
-                            'title': None,
-                            'content': None,
-                            'status': 'failed',
-                            'error': str(e)
-                        }
-
-                # Create tasks for all URLs
-                try:
-                    tasks = [
-                        asyncio.create_task(fetch_and_parse(url))
-                        for url in urls
-                    ]
-                except Exception as e:
-                    raise Exception(f"Failed to create tasks: {str(e)}")
+            session = await self._get_session()
 
-                # Yield results as they complete
+            async def fetch_and_parse(url: str):
+                """Fetch URL and parse in one go"""
                 try:
-                    for completed_task in asyncio.as_completed(tasks):
-                        try:
-                            result = await completed_task
-                            yield result
-                        except Exception as e:
-                            yield {
-                                'url': 'unknown',
-                                'title': None,
-                                'content': None,
-                                'status': 'failed',
-                                'error': f"Task completion failed: {str(e)}"
-                            }
+                    if not url or not isinstance(url, str):
+                        raise ValueError(f"Invalid URL: {url}")
+
+                    return await self._fetch_and_parse(session, url)
                 except Exception as e:
-                    raise Exception(f"Error processing tasks: {str(e)}")
+                    return {
+                        'url': url,
+                        'title': None,
+                        'content': None,
+                        'status': ScrapeStatus.FAILED.value,
+                        'error': str(e)
+                    }
+
+            # Yield results as they complete
+            try:
+                async for result in self.scheduler.run(urls, fetch_and_parse, priorities):
+                    yield result
+            except Exception as e:
+                raise Exception(f"Error processing tasks: {str(e)}")
 
         except Exception as e:
             yield {
                 'url': 'unknown',
                 'title': None,
                 'content': None,
-                'status': 'failed',
+                'status': ScrapeStatus.FAILED.value,
                 'error': f"Critical scraper error: {str(e)}"
             }
 
 
-scraper = AsyncWebScraper()
+scraper = AsyncWebScraper(
+    page_cache=PageCache() if PAGE_CACHE_ENABLED else None
+)
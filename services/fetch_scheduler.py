@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+from collections import defaultdict
+from urllib.parse import urlsplit
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from utils.config import (
+    SCRAPER_MAX_IN_FLIGHT,
+    SCRAPER_PER_DOMAIN_CONCURRENCY,
+    SCRAPER_POLITENESS_DELAY
+)
+
+
+def domain_of(url: str) -> str:
+    try:
+        host = (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class FetchScheduler:
+    """
+    Runs a worker over many URLs with a global in-flight limit, a
+    per-domain concurrency limit and a politeness delay between requests
+    to the same domain. Among runnable URLs the lowest priority value
+    starts first; results are yielded as they complete.
+
+    The limits hold across concurrent run() calls: in-flight counts and
+    per-domain delays live on the instance, so two API requests never hit
+    the same host harder than one would.
+    """
+
+    def __init__(self, max_in_flight: int = SCRAPER_MAX_IN_FLIGHT,
+                 per_domain: int = SCRAPER_PER_DOMAIN_CONCURRENCY,
+                 politeness_delay: float = SCRAPER_POLITENESS_DELAY):
+        self.max_in_flight = max_in_flight
+        self.per_domain = per_domain
+        self.politeness_delay = politeness_delay
+        self.in_flight = 0
+        self.active: Dict[str, int] = defaultdict(int)
+        self.next_allowed: Dict[str, float] = {}
+        # Futures of run() calls waiting for a slot to free up
+        self._waiters: Set[asyncio.Future] = set()
+
+    def _acquire(self, domain: str, now: float) -> None:
+        self.in_flight += 1
+        self.active[domain] += 1
+        self.next_allowed[domain] = now + self.politeness_delay
+
+    def _release(self, domain: str) -> None:
+        self.in_flight -= 1
+        self.active[domain] -= 1
+        if self.active[domain] <= 0:
+            del self.active[domain]
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def _prune(self, now: float) -> None:
+        """Forget delays that have passed, so next_allowed does not grow with every domain ever seen"""
+        for domain in [d for d, t in self.next_allowed.items() if t <= now and d not in self.active]:
+            del self.next_allowed[domain]
+
+    async def run(self, urls: List[str], worker: Callable[[str], Awaitable[Any]],
+                  priorities: Optional[Dict[str, int]] = None) -> AsyncGenerator[Any, None]:
+        priorities = priorities or {}
+        loop = asyncio.get_running_loop()
+
+        # One heap of (priority, arrival order, url) per domain
+        pending: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+        for order, url in enumerate(urls):
+            heapq.heappush(pending[domain_of(url)], (priorities.get(url, 0), order, url))
+
+        running: Dict[asyncio.Task, str] = {}
+
+        try:
+            while pending or running:
+                now = loop.time()
+
+                # Start the best runnable URLs until the global limit is reached
+                while self.in_flight < self.max_in_flight:
+                    best = None
+                    for domain, heap in pending.items():
+                        if self.active.get(domain, 0) >= self.per_domain:
+                            continue
+                        if self.next_allowed.get(domain, 0.0) > now:
+                            continue
+                        if best is None or heap[0] < pending[best][0]:
+                            best = domain
+                    if best is None:
+                        break
+
+                    _, _, url = heapq.heappop(pending[best])
+                    if not pending[best]:
+                        del pending[best]
+                    self._acquire(best, now)
+                    running[asyncio.create_task(worker(url))] = best
+
+                # Wake up on a completion (ours or another run's), or when a
+                # delayed domain frees up; at the global cap only a completion helps
+                timeout = None
+                if self.in_flight < self.max_in_flight:
+                    waits = [
+                        self.next_allowed[domain] - now for domain in pending
+                        if self.active.get(domain, 0) < self.per_domain
+                        and self.next_allowed.get(domain, 0.0) > now
+                    ]
+                    timeout = min(waits) if waits else None
+
+                waiter = loop.create_future()
+                self._waiters.add(waiter)
+                try:
+                    done, _ = await asyncio.wait(
+                        [*running, waiter], timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    self._waiters.discard(waiter)
+                    waiter.cancel()
+                for task in done:
+                    if task is waiter:
+                        continue
+                    self._release(running.pop(task))
+                    yield task.result()
+        finally:
+            for task, domain in running.items():
+                task.cancel()
+                self._release(domain)
+            self._prune(loop.time())
+
+
+fetch_scheduler = FetchScheduler()
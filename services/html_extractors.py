@@ -0,0 +1,322 @@
+"""
+Pluggable HTML-to-text extractors used by the scraper
+"""
+import codecs
+import re
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Optional
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from lxml import etree
+from utils.sync_logger import sync_logger as logger
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:  # optional dependency
+    SelectolaxParser = None
+
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+# Bytes searched for a <meta> charset; HTML requires it near the top of <head>
+META_CHARSET_SCAN_BYTES = 4096
+
+# Elements that never carry article text
+NON_CONTENT_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "canvas"]
+# Elements that look like boilerplate in main-content mode
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside", "form", "button", "menu", "dialog"]
+# class/id tokens that mark boilerplate blocks in main-content mode
+BOILERPLATE_ATTR_RE = re.compile(
+    r"(?:^|[\s_-])(?:cookie|consent|gdpr|banner|newsletter|subscribe|share|sharing|social|"
+    r"related|recommended|promo|advert|ads?|sponsor|sidebar|breadcrumbs?|comments?|"
+    r"popup|modal|footer|nav|navbar|menu|masthead)(?:$|[\s_-])",
+    re.IGNORECASE
+)
+# Tags that may hold the article even when their class/id looks like boilerplate
+PROTECTED_TAGS = {"html", "body", "main", "article"}
+# Below this many characters a detected main block is not trusted
+MIN_MAIN_CONTENT_CHARS = 200
+# A boilerplate-looking block inside the main block is only dropped when it
+# has little text or is mostly link text; wrappers around the article are kept
+BOILERPLATE_MAX_TEXT_CHARS = 200
+BOILERPLATE_MIN_LINK_DENSITY = 0.5
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def collapse_whitespace(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def is_boilerplate_block(text_chars: int, link_chars: int) -> bool:
+    """True for blocks with too little text, or too much of it in links, to be article text"""
+    if text_chars < BOILERPLATE_MAX_TEXT_CHARS:
+        return True
+    return link_chars / text_chars >= BOILERPLATE_MIN_LINK_DENSITY
+
+
+class HtmlExtractor(ABC):
+    """Turns an HTML document into {'title', 'content'}"""
+
+    name = "base"
+
+    def __init__(self, main_content_only: bool = False):
+        self.main_content_only = main_content_only
+
+    @abstractmethod
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        ...
+
+
+class SoupExtractor(HtmlExtractor):
+    """
+    Pure-Python BeautifulSoup extraction, the original behaviour.
+    Always returns the whole page text; main_content_only is ignored.
+    """
+
+    name = "soup"
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Remove scripts and styles
+        for script in soup(["script", "style"]):
+            script.extract()
+
+        text = soup.get_text()
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip()
+                  for line in lines for phrase in line.split("  "))
+        text = ' '.join(chunk for chunk in chunks if chunk)
+
+        return {
+            'title': soup.title.string if soup.title else 'No title',
+            'content': text
+        }
+
+
+class LxmlExtractor(HtmlExtractor):
+    """
+    libxml2-backed extraction. In main-content mode the main block is
+    picked on the untouched page first, then boilerplate inside it is
+    dropped; if that leaves too little text, the whole page is used.
+    """
+
+    name = "lxml"
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        data = html.encode("utf-8", errors="replace") if isinstance(html, str) else html
+        if not data or not data.strip():
+            return {'title': 'No title', 'content': ''}
+
+        doc = self._parse(data)
+        title = doc.findtext('.//title')
+        title = collapse_whitespace(title) if title else 'No title'
+        root = self._body(doc)
+
+        if self.main_content_only:
+            main = self._find_main(root)
+            if main is not None:
+                self._drop_boilerplate(main)
+                text = self._text(main)
+                if len(text) >= MIN_MAIN_CONTENT_CHARS:
+                    return {'title': title, 'content': text}
+                # The main block was pruned in place; read the page from a fresh parse
+                root = self._body(self._parse(data))
+
+        return {'title': title, 'content': self._text(root)}
+
+    @staticmethod
+    def _parse(data: bytes):
+        parser = lxml_html.HTMLParser(encoding="utf-8", remove_comments=True)
+        return lxml_html.document_fromstring(data, parser=parser)
+
+    @staticmethod
+    def _body(doc):
+        etree.strip_elements(doc, *NON_CONTENT_TAGS, with_tail=False)
+        body = doc.find('body')
+        return doc if body is None else body
+
+    @staticmethod
+    def _text(element) -> str:
+        return collapse_whitespace(" ".join(element.itertext()))
+
+    def _drop_boilerplate(self, main) -> None:
+        """Drop short or link-heavy boilerplate-looking blocks below main (never main itself)"""
+        doomed = []
+        for element in main.iterdescendants(etree.Element):
+            if element.tag in PROTECTED_TAGS:
+                continue
+            if element.tag not in BOILERPLATE_TAGS:
+                attrs = f"{element.get('class', '')} {element.get('id', '')}"
+                if not attrs.strip() or not BOILERPLATE_ATTR_RE.search(attrs):
+                    continue
+            link_chars = sum(len(self._text(link)) for link in element.iter('a'))
+            if is_boilerplate_block(len(self._text(element)), link_chars):
+                doomed.append(element)
+        for element in doomed:
+            if element.getparent() is not None:
+                element.drop_tree()
+
+    def _find_main(self, root):
+        # Prefer explicit markup, then the block holding the most paragraph text
+        articles = root.findall('.//article')
+        if articles:
+            return max(articles, key=lambda el: len(self._text(el)))
+        main = root.find('.//main')
+        if main is None:
+            found = root.xpath('.//*[@role="main"]')
+            main = found[0] if found else None
+        if main is not None:
+            return main
+
+        scores = defaultdict(int)
+        for paragraph in root.iter('p'):
+            parent = paragraph.getparent()
+            if parent is not None:
+                scores[parent] += len(self._text(paragraph))
+        if not scores:
+            return None
+        return max(scores, key=scores.get)
+
+
+class SelectolaxExtractor(HtmlExtractor):
+    """Lexbor-backed extraction via the optional selectolax package"""
+
+    name = "selectolax"
+
+    def __init__(self, main_content_only: bool = False):
+        if SelectolaxParser is None:
+            raise ImportError("selectolax is not installed")
+        super().__init__(main_content_only)
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        tree = SelectolaxParser(html)
+        title_node = tree.css_first('title')
+        title = collapse_whitespace(title_node.text()) if title_node else 'No title'
+
+        root = self._body(tree)
+        if root is None:
+            return {'title': title, 'content': ''}
+
+        if self.main_content_only:
+            main = self._find_main(root)
+            if main is not None:
+                self._drop_boilerplate(main)
+                text = self._text(main)
+                if len(text) >= MIN_MAIN_CONTENT_CHARS:
+                    return {'title': title, 'content': text}
+                # The main block was pruned in place; read the page from a fresh parse
+                root = self._body(SelectolaxParser(html))
+
+        return {'title': title, 'content': self._text(root)}
+
+    @staticmethod
+    def _body(tree):
+        tree.strip_tags(NON_CONTENT_TAGS)
+        return tree.body or tree.root
+
+    @staticmethod
+    def _text(node) -> str:
+        return collapse_whitespace(node.text(separator=" "))
+
+    def _drop_boilerplate(self, main) -> None:
+        """Drop short or link-heavy boilerplate-looking blocks below main (never main itself)"""
+        doomed = []
+        for node in main.traverse(include_text=False):
+            if node.mem_id == main.mem_id or node.tag in PROTECTED_TAGS:
+                continue
+            if node.tag not in BOILERPLATE_TAGS:
+                attrs = f"{node.attributes.get('class') or ''} {node.attributes.get('id') or ''}"
+                if not attrs.strip() or not BOILERPLATE_ATTR_RE.search(attrs):
+                    continue
+            link_chars = sum(len(self._text(link)) for link in node.css('a'))
+            if is_boilerplate_block(len(self._text(node)), link_chars):
+                doomed.append(node)
+        # Only the outermost doomed blocks are decomposed; nested ones go with them
+        doomed_ids = {node.mem_id for node in doomed}
+        outermost = []
+        for node in doomed:
+            ancestor = node.parent
+            while ancestor is not None and ancestor.mem_id != main.mem_id:
+                if ancestor.mem_id in doomed_ids:
+                    break
+                ancestor = ancestor.parent
+            else:
+                outermost.append(node)
+        for node in outermost:
+            node.decompose()
+
+    def _find_main(self, root):
+        articles = root.css('article')
+        if articles:
+            return max(articles, key=lambda node: len(self._text(node)))
+        main = root.css_first('main') or root.css_first('[role="main"]')
+        if main is not None:
+            return main
+
+        scores = defaultdict(int)
+        parents = {}
+        for paragraph in root.css('p'):
+            parent = paragraph.parent
+            if parent is not None:
+                scores[parent.mem_id] += len(self._text(paragraph))
+                parents[parent.mem_id] = parent
+        if not scores:
+            return None
+        return parents[max(scores, key=scores.get)]
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+    SelectolaxExtractor.name: SelectolaxExtractor,
+}
+
+
+def get_extractor(name: str, main_content_only: bool = False) -> HtmlExtractor:
+    """Build the named extractor, falling back to lxml when it is unavailable"""
+    try:
+        return EXTRACTORS[name](main_content_only=main_content_only)
+    except (KeyError, ImportError) as e:
+        logger.warning(f"HTML extractor '{name}' unavailable ({str(e)}), using lxml")
+        return LxmlExtractor(main_content_only=main_content_only)
+
+
+_extractors: Dict[tuple, HtmlExtractor] = {}
+
+
+def detect_encoding(body: bytes, declared: Optional[str] = None) -> str:
+    """
+    Encoding of an HTML body: a UTF-8 BOM, the HTTP header charset, a
+    <meta> charset, else UTF-8 if the body is valid UTF-8, else cp1252.
+    """
+    if body.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    meta = META_CHARSET_RE.search(body[:META_CHARSET_SCAN_BYTES])
+    for candidate in (declared, meta.group(1).decode("ascii", "ignore") if meta else None):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+
+def extract_page(body: bytes, encoding: Optional[str], extractor_name: str,
+                 main_content_only: bool) -> Dict[str, Optional[str]]:
+    """
+    Parse-pool entry point: raw HTML bytes in, a compact {'title', 'content'}
+    record out. Without a header charset the encoding is sniffed from the
+    body. Extractors are built once per worker process.
+    """
+    key = (extractor_name, main_content_only)
+    extractor = _extractors.get(key)
+    if extractor is None:
+        extractor = _extractors[key] = get_extractor(extractor_name, main_content_only)
+    return extractor.extract(body.decode(detect_encoding(body, encoding), errors="replace"))
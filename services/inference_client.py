@@ -0,0 +1,82 @@
+"""
+Client side of the shared inference server (see services/inference_server.py)
+"""
+import asyncio
+import json
+import struct
+from typing import Any, Dict, List, Optional
+from utils.async_logger import logger
+from utils.config import INFERENCE_SOCKET_PATH, INFERENCE_TIMEOUT
+
+# Every message is a 4-byte big-endian length followed by that many bytes of JSON
+HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Read one framed JSON message, or None when the peer closed the connection"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Inference message of {length} bytes exceeds the limit")
+    return json.loads(await reader.readexactly(length))
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message).encode("utf-8")
+    writer.write(HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+class InferenceClient:
+    """
+    Calls the model-host process over its Unix socket, one short-lived
+    connection per call, so API workers never load a classifier themselves.
+    """
+
+    def __init__(self, socket_path: str = INFERENCE_SOCKET_PATH, timeout: float = INFERENCE_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    async def _call(self, method: str, **params) -> Any:
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            await write_message(writer, dict(params, method=method))
+            response = await asyncio.wait_for(read_message(reader), self.timeout)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        if response is None:
+            raise ConnectionError("Inference server closed the connection")
+        if response.get("error"):
+            raise RuntimeError(f"Inference server error: {response['error']}")
+        return response.get("result")
+
+    async def process_news_batch(self, news_items: List[Dict]) -> List[Optional[Dict]]:
+        """Classify news items on the server; same contract as batch_classify_sync"""
+        try:
+            return await self._call("process_news_batch", news_items=news_items)
+        except Exception as e:
+            logger.error(f"Remote batch classification failed: {str(e)}")
+            raise
+
+    async def warm_up(self) -> None:
+        """Wait (up to the timeout) for the server to come up and warm its classifier"""
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        while True:
+            try:
+                return await self._call("warm_up")
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The server may still be starting next to the API workers
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise
+                await asyncio.sleep(1)
+
+    async def status(self) -> Dict[str, Any]:
+        return await self._call("status")
+
+
+inference_client = InferenceClient()
@@ -0,0 +1,124 @@
+"""
+Cross-request micro-batching for sentiment inference
+"""
+import asyncio
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+from utils.async_logger import logger
+from utils.config import INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT
+from utils.threadpool import THREAD_POOL, INFERENCE_METRICS, PoolMetrics, run_in_pool
+
+
+class InferenceScheduler:
+    """
+    Queues items from every in-flight request and runs them through
+    run_batch together. A batch closes when it holds max_batch_size items
+    or max_wait seconds after its first item arrived, whichever comes
+    first. Batches run one at a time (one model replica) on the executor,
+    and each caller gets its own items' results back in order.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+                 max_wait: float = INFERENCE_MAX_WAIT,
+                 executor: concurrent.futures.Executor = THREAD_POOL,
+                 metrics: PoolMetrics = INFERENCE_METRICS):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.metrics = metrics
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Batch handed to run_batch and not yet answered
+        self._running: List[tuple] = []
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        """Queue items and wait for their results, in the order given"""
+        if not items:
+            return []
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        for item, future in zip(items, futures):
+            self._queue.put_nowait((item, future))
+        return list(await asyncio.gather(*futures))
+
+    async def _next_batch(self) -> List[tuple]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (cancelled) do not need their items scored
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            self._running = batch
+            try:
+                results = await run_in_pool(self.executor, self.metrics, self.run_batch, items)
+                if results is None or len(results) != len(items):
+                    raise ValueError(
+                        f"run_batch returned {0 if results is None else len(results)} results for {len(items)} items"
+                    )
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.error(f"Inference batch of {len(items)} items failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self._running = []
+            self.batches += 1
+            self.items += len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0
+        }
+
+    async def close(self) -> None:
+        """Stop the worker and fail every item still queued or running, so no caller waits forever"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        pending = self._running
+        self._running = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference scheduler closed"))
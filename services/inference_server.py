@@ -0,0 +1,133 @@
+"""
+Shared inference server: one process owns the classifier and serves
+classification calls from every API worker over a Unix socket.
+
+Usage:
+    python -m services.inference_server [--socket PATH]
+
+Run it next to `uvicorn main:app --workers N` with INFERENCE_MODE = "server"
+so the model is loaded once instead of once per worker.
+"""
+import argparse
+import asyncio
+import os
+import stat
+from typing import Any, Dict
+from utils.async_logger import logger
+from utils.config import INFERENCE_SOCKET_PATH, INFERENCE_BATCHING_ENABLED
+from utils.readiness import readiness
+from utils.threadpool import THREAD_POOL, INFERENCE_METRICS, run_in_pool, get_pool_metrics
+from services.inference_client import read_message, write_message
+from classifiers.result_cache import classification_cache
+from classifiers.runner import batch_classify_sync, warm_up_classifier_sync, classification_scheduler
+
+
+class InferenceServer:
+    """Answers framed JSON requests: process_news_batch, warm_up and status"""
+
+    def __init__(self, socket_path: str = INFERENCE_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.warm_up_task = None
+
+    async def _warm_up(self) -> None:
+        readiness.start("classifier")
+        try:
+            await run_in_pool(THREAD_POOL, INFERENCE_METRICS, warm_up_classifier_sync)
+            readiness.ready("classifier")
+            logger.info("Inference server classifier ready")
+        except Exception as e:
+            readiness.failed("classifier", str(e))
+            logger.error(f"Inference server warm-up failed: {str(e)}")
+            raise
+
+    async def dispatch(self, request: Dict[str, Any]) -> Any:
+        method = request.get("method")
+        if method == "process_news_batch":
+            if INFERENCE_BATCHING_ENABLED:
+                # Requests from every API worker share forward passes
+                return await classification_scheduler.submit(request.get("news_items") or [])
+            return await run_in_pool(
+                THREAD_POOL, INFERENCE_METRICS, batch_classify_sync, request.get("news_items") or []
+            )
+        if method == "warm_up":
+            await asyncio.shield(self.warm_up_task)
+            return None
+        if method == "status":
+            return {
+                "state": readiness.state(),
+                "components": readiness.snapshot(),
+                "pools": get_pool_metrics(),
+                "batching": classification_scheduler.stats()
+            }
+        raise ValueError(f"Unknown method: {method}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                try:
+                    response = {"result": await self.dispatch(request)}
+                except Exception as e:
+                    response = {"error": str(e)}
+                await write_message(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Inference connection failed: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _socket_in_use(self) -> bool:
+        """True if a live server still accepts connections on socket_path"""
+        try:
+            _, writer = await asyncio.open_unix_connection(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        writer.close()
+        return True
+
+    async def _bind(self) -> asyncio.AbstractServer:
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.lexists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise RuntimeError(f"{self.socket_path} exists and is not a socket")
+            if await self._socket_in_use():
+                raise RuntimeError(f"Another inference server is listening on {self.socket_path}")
+            # A stale socket file from a previous run would make bind() fail
+            os.unlink(self.socket_path)
+        # Not listening yet, so nobody can connect before the socket is owner-only
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path, start_serving=False)
+        os.chmod(self.socket_path, 0o600)
+        return server
+
+    async def serve(self) -> None:
+        server = await self._bind()
+        self.warm_up_task = asyncio.create_task(self._warm_up())
+        logger.info(f"Inference server listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await classification_scheduler.close()
+            if classification_cache is not None:
+                classification_cache.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", default=INFERENCE_SOCKET_PATH, help="Unix socket path")
+    args = parser.parse_args()
+    try:
+        asyncio.run(InferenceServer(args.socket).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Any
+from utils.sync_logger import sync_logger as logger
+from utils.helper_functions import canonicalize_url
+from utils.config import (
+    PAGE_CACHE_PATH,
+    PAGE_CACHE_MAX_ENTRIES,
+    PAGE_CACHE_TTL,
+    PAGE_CACHE_STORE_HTML
+)
+
+
+def content_hash(body: bytes) -> str:
+    """Hash of the raw page body, used to skip re-parsing unchanged pages"""
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    """
+    SQLite-backed store of scraped pages keyed by canonical URL.
+    Keeps the extracted title/content, the hash of the raw body and the
+    ETag/Last-Modified validators used to revalidate stale entries.
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, ttl: int = PAGE_CACHE_TTL,
+                 max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+                 store_html: bool = PAGE_CACHE_STORE_HTML):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store_html = store_html
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url_key TEXT PRIMARY KEY, url TEXT NOT NULL, title TEXT, content TEXT, "
+                "html BLOB, html_hash TEXT, etag TEXT, last_modified TEXT, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for url (fresh or stale), or None"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT title, content, html_hash, etag, last_modified, fetched_at "
+                    "FROM pages WHERE url_key = ?", (canonicalize_url(url),)
+                ).fetchone()
+        except Exception as e:
+            logger.error(f"Page cache read failed for {url}: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        title, content, html_hash, etag, last_modified, fetched_at = row
+        return {
+            "title": title,
+            "content": content,
+            "html_hash": html_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at <= self.ttl
+        }
+
+    def put(self, url: str, result: Dict, body: bytes, html_hash: str,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Store a freshly parsed page and evict the least recently used entries"""
+        now = time.time()
+        try:
+            blob = zlib.compress(body) if self.store_html else None
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (url_key, url, title, content, html, html_hash, "
+                    "etag, last_modified, fetched_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (canonicalize_url(url), url, result.get("title"), result.get("content"), blob,
+                     html_hash, etag, last_modified, now, now)
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM pages WHERE url_key IN ("
+                        "SELECT url_key FROM pages ORDER BY accessed_at ASC LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                conn.commit()
+            self.misses += 1
+        except Exception as e:
+            logger.error(f"Page cache write failed for {url}: {str(e)}")
+
+    def touch(self, url: str, revalidated: bool = False,
+              etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Record a hit; a revalidated entry also becomes fresh again"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if revalidated:
+                    conn.execute(
+                        "UPDATE pages SET fetched_at = ?, accessed_at = ?, "
+                        "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                        "WHERE url_key = ?",
+                        (now, now, etag, last_modified, canonicalize_url(url))
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE pages SET accessed_at = ? WHERE url_key = ?",
+                        (now, canonicalize_url(url))
+                    )
+                conn.commit()
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+        except Exception as e:
+            logger.error(f"Page cache update failed for {url}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.revalidated) / total if total else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,172 @@
+"""
+Deterministic canonicalization of the company names returned by the LLM
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.config import COMPANY_FUZZY_THRESHOLD
+
+# Legal-form tokens dropped from the matching key ("Zerodha Broking Ltd" -> "zerodha broking")
+LEGAL_SUFFIXES = {
+    "ltd", "limited", "pvt", "private", "inc", "incorporated", "corp", "corporation",
+    "co", "company", "llc", "llp", "plc", "lp", "pte", "gmbh", "ag", "sa", "nv", "bv", "pty"
+}
+# Tokens that name the same business when appended ("Adani" -> "Adani Group")
+DESCRIPTOR_WORDS = {
+    "group", "groups", "holding", "holdings", "enterprise", "enterprises", "industries",
+    "international", "global", "worldwide"
+}
+# Parentheticals that describe the person's role rather than the company
+ROLE_WORDS_RE = re.compile(
+    r"\b(?:co-?founder|founder|owner|ceo|cto|cfo|coo|chairman|chairperson|president|director|"
+    r"board|investor|shareholder|stake|partner|promoter|member)\b",
+    re.IGNORECASE
+)
+PARENTHETICAL_RE = re.compile(r"\s*\(([^()]*)\)")
+# Model commentary that leaks into comma-separated answers: whole entries
+# such as "None" or "N/A", and sentence-shaped ones such as "Note: ..." or
+# "the list remains unchanged". Names that merely contain such a word
+# ("Output Ventures", "Unknown Worlds Entertainment") are kept.
+JUNK_ENTRY_RE = re.compile(
+    r"^(?:none|nil|null|n/?a|unknown|nothing|output|note|no companies(?: found)?|"
+    r"not (?:mentioned|specified|found|available))\W*$",
+    re.IGNORECASE
+)
+JUNK_PHRASE_RE = re.compile(
+    r"^(?:note|output)\s*:|\b(?:no (?:other )?companies (?:found|mentioned|identified)|"
+    r"(?:the )?given list|remains? unchanged|duplicates? (?:removed|merged)|"
+    r"(?:is|are|was|were) not (?:mentioned|specified))\b",
+    re.IGNORECASE
+)
+LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•·]+|\d+[.)])\s*")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_NAME_TOKENS = 8
+MAX_NAME_LENGTH = 100
+
+
+def clean_company_name(raw: str) -> Optional[str]:
+    """
+    Tidy one raw LLM entry for display: first line only, no list markers,
+    quotes or role parentheticals, single spaces. None if nothing is left.
+    """
+    if not raw:
+        return None
+    lines = [line for line in raw.strip().splitlines() if line.strip()]
+    if not lines:
+        return None
+    name = LIST_MARKER_RE.sub("", lines[0])
+    name = PARENTHETICAL_RE.sub(
+        lambda m: "" if ROLE_WORDS_RE.search(m.group(1)) else m.group(0), name
+    )
+    name = " ".join(name.split()).strip(" \t\"'`“”‘’.,;:")
+    return name or None
+
+
+def company_key(name: str) -> Tuple[str, ...]:
+    """Matching key of a company name: folded tokens without legal suffixes, parentheticals or a leading 'the'"""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    folded = PARENTHETICAL_RE.sub(" ", folded).replace("&", " and ")
+    tokens = _TOKEN_RE.findall(folded)
+    while tokens and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    return tuple(tokens)
+
+
+def is_junk_company(name: str, key: Tuple[str, ...], person: Optional[str] = None) -> bool:
+    """True for entries that are model commentary, sentences or the person's full name"""
+    if not key or len(name) > MAX_NAME_LENGTH or len(key) > MAX_NAME_TOKENS:
+        return True
+    if name.count("(") != name.count(")") or JUNK_ENTRY_RE.match(name) or JUNK_PHRASE_RE.search(name):
+        return True
+    # Sentence fragments start lower-case and run on ("it remains unchanged")
+    if name[0].islower() and len(key) > 2:
+        return True
+    # A surname alone is kept: family groups ("Tata", "Adani") are often the point of the lookup
+    if person and key == company_key(person):
+        return True
+    return False
+
+
+def _canonical_rank(name: str, key: Tuple[str, ...]) -> Tuple[int, int, int]:
+    """Sort key for picking a cluster's display name: fewest key tokens, then no parentheticals, then shortest"""
+    return len(key), int("(" in name), len(name)
+
+
+def canonicalize_companies(names: Iterable[str], person: Optional[str] = None,
+                           fuzzy_threshold: float = COMPANY_FUZZY_THRESHOLD) -> List[str]:
+    """
+    Merge variants of the same company and drop junk entries.
+
+    Names sharing a key (case, punctuation and legal suffix folded) or a key
+    with the spaces removed are one company; so are near-identical keys
+    (fuzzy ratio >= fuzzy_threshold). A name joins longer names that only
+    add legal suffixes or descriptors to it ("Adani" -> "Adani Group"),
+    when those longer names are themselves one chain; other extensions
+    ("Apple" with "Apple Music") are different companies. Each company is
+    returned once, under its shortest, cleanest variant, in order of first
+    appearance.
+    """
+    variants: Dict[Tuple[str, ...], List[str]] = {}
+    for raw in names:
+        name = clean_company_name(raw)
+        if not name:
+            continue
+        key = company_key(name)
+        if is_junk_company(name, key, person):
+            continue
+        variants.setdefault(key, [])
+        if name not in variants[key]:
+            variants[key].append(name)
+
+    keys = list(variants)
+    parent = {key: key for key in keys}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    compact: Dict[str, Tuple[str, ...]] = {}
+    for key in keys:
+        joined = "".join(key)
+        if joined in compact:
+            union(compact[joined], key)
+        else:
+            compact[joined] = key
+
+    for i, a in enumerate(keys):
+        joined_a = "".join(a)
+        for b in keys[i + 1:]:
+            joined_b = "".join(b)
+            if abs(len(joined_a) - len(joined_b)) > 2 or joined_a[:1] != joined_b[:1]:
+                continue
+            matcher = SequenceMatcher(None, joined_a, joined_b)
+            if matcher.quick_ratio() >= fuzzy_threshold and matcher.ratio() >= fuzzy_threshold:
+                union(a, b)
+
+    for short in keys:
+        longer = sorted(
+            (key for key in keys if len(key) > len(short) and key[:len(short)] == short
+             and all(t in LEGAL_SUFFIXES or t in DESCRIPTOR_WORDS for t in key[len(short):])),
+            key=len
+        )
+        if longer and all(b[:len(a)] == a for a, b in zip(longer, longer[1:])):
+            union(longer[0], short)
+
+    clusters: Dict[Tuple[str, ...], List[Tuple[str, Tuple[str, ...]]]] = {}
+    for key in keys:
+        clusters.setdefault(find(key), []).extend((name, key) for name in variants[key])
+
+    return [
+        min(members, key=lambda member: _canonical_rank(*member))[0]
+        for members in clusters.values()
+    ]
@@ -1,2 +1,148 @@
 OLLAMA_MODEL = "llama3.2:1b"
-CLASSIFIER_TYPE = "finbert"
\ No newline at end of file
+CLASSIFIER_TYPE = "finbert"
+
+# Maximum number of DuckDuckGo searches in flight at once
+SEARCH_CONCURRENCY = 8
+
+# Disk-backed cache of DuckDuckGo results, shared by all workers
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_PATH = ".cache/search_cache.sqlite3"
+SEARCH_CACHE_MAX_ENTRIES = 20000
+# Seconds a cached result stays fresh, per search method
+SEARCH_CACHE_TTLS = {
+    "text": 24 * 60 * 60,
+    "news": 60 * 60,
+}
+
+# Local store of scraped pages keyed by normalized URL
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_PATH = ".cache/page_cache.sqlite3"
+PAGE_CACHE_MAX_ENTRIES = 5000
+# Seconds before a cached page is revalidated with the origin
+PAGE_CACHE_TTL = 6 * 60 * 60
+# Also keep the zlib-compressed raw HTML of each page
+PAGE_CACHE_STORE_HTML = False
+
+# Connection pool of the scraper's long-lived HTTP session
+SCRAPER_CONNECTION_LIMIT = 100
+SCRAPER_CONNECTION_LIMIT_PER_HOST = 8
+SCRAPER_DNS_CACHE_TTL = 300
+SCRAPER_KEEPALIVE_TIMEOUT = 30
+
+# Fetch scheduling: global in-flight cap, per-domain cap and the minimum
+# delay in seconds between two requests to the same domain
+SCRAPER_MAX_IN_FLIGHT = 32
+SCRAPER_PER_DOMAIN_CONCURRENCY = 2
+SCRAPER_POLITENESS_DELAY = 0.5
+
+# Streaming fetch: only these content types are read (a missing header is
+# accepted) and bodies are cut off after SCRAPER_MAX_BODY_BYTES
+SCRAPER_STREAM_BODY = True
+SCRAPER_MAX_BODY_BYTES = 2 * 1024 * 1024
+SCRAPER_READ_CHUNK_SIZE = 64 * 1024
+SCRAPER_ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# HTML-to-text extraction: "lxml", "selectolax" (optional package) or
+# "soup" (BeautifulSoup html.parser). Main-content mode drops navigation,
+# footers, cookie banners and similar boilerplate and keeps the article body.
+HTML_EXTRACTOR = "lxml"
+HTML_MAIN_CONTENT_ONLY = True
+
+# HTML parsing runs in its own pool, apart from THREAD_POOL (inference):
+# "process" scales parsing across cores, "thread" keeps it in-process
+PARSE_POOL_TYPE = "process"
+PARSE_POOL_WORKERS = 4
+
+# Company discovery: scraped pages wait in a bounded queue for this many
+# concurrent LLM extraction workers (match the Ollama server's OLLAMA_NUM_PARALLEL)
+LLM_EXTRACTION_WORKERS = 4
+LLM_EXTRACTION_QUEUE_SIZE = 16
+
+# Pre-LLM passage selection: only text windows around mentions of the
+# target person are sent, within an approximate token budget
+PASSAGE_SELECTION_ENABLED = True
+PASSAGE_WINDOW_WORDS = 80
+PASSAGE_TOKEN_BUDGET = 1000
+PASSAGE_FUZZY_THRESHOLD = 0.85
+
+# Cache of LLM chain outputs (the chains run at temperature 0)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = ".cache/llm_cache.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 50000
+
+# Batched extraction: up to LLM_BATCH_MAX_DOCS selected passages no longer
+# than LLM_BATCH_MAX_PASSAGE_CHARS each share one prompt
+LLM_BATCH_ENABLED = True
+LLM_BATCH_MAX_DOCS = 4
+LLM_BATCH_MAX_PASSAGE_CHARS = 3000
+
+# Company-name cleanup after discovery: "local" merges variants and drops
+# junk deterministically, "llm" sends the whole list to the LLM dedup prompt
+COMPANY_CANONICALIZER = "local"
+COMPANY_FUZZY_THRESHOLD = 0.9
+
+# FinBERT scoring: each article is tokenized and split into windows of
+# FINBERT_MAX_LENGTH tokens overlapping by FINBERT_WINDOW_STRIDE; at most
+# FINBERT_MAX_WINDOWS of them are scored
+FINBERT_MAX_LENGTH = 512
+FINBERT_MAX_WINDOWS = 4
+FINBERT_WINDOW_STRIDE = 64
+# Articles are cut to this many characters before tokenizing, so a multi-MB
+# page is not tokenized in full only to keep FINBERT_MAX_WINDOWS windows of it
+FINBERT_MAX_CHARS = 20000
+# Windows are sorted by length and batched up to this many padded tokens
+# (and at most FINBERT_MAX_BATCH_SIZE windows) per forward pass
+FINBERT_BATCH_TOKENS = 8192
+FINBERT_MAX_BATCH_SIZE = 64
+
+# Zero-shot (bart-large-mnli) scoring: each article is paired with one
+# hypothesis per label, truncated to ZEROSHOT_MAX_LENGTH tokens, and the
+# pairs are length-bucketed into batches of at most ZEROSHOT_BATCH_TOKENS
+ZEROSHOT_MAX_LENGTH = 512
+# Articles are cut to this many characters before tokenizing; comfortably
+# more than ZEROSHOT_MAX_LENGTH tokens of text
+ZEROSHOT_MAX_CHARS = 8 * ZEROSHOT_MAX_LENGTH
+ZEROSHOT_BATCH_TOKENS = 8192
+ZEROSHOT_MAX_BATCH_SIZE = 32
+
+# Classifier inference backend: "torch" (fp32 PyTorch) or "onnx" (ONNX
+# Runtime, optional onnxruntime/onnx packages). Models are exported once
+# under ONNX_MODEL_DIR and, with ONNX_QUANTIZE, dynamically quantized to int8.
+# ONNX_NUM_THREADS = 0 lets ONNX Runtime pick the intra-op thread count.
+INFERENCE_BACKEND = "torch"
+ONNX_QUANTIZE = True
+ONNX_MODEL_DIR = ".cache/onnx"
+ONNX_NUM_THREADS = 0
+
+# Startup warm-up: load the classifier (and ask Ollama to load its model)
+# in the background; /health answers 503 until the classifier is ready
+WARMUP_ENABLED = True
+WARMUP_OLLAMA = True
+
+# Classifier placement: "local" loads the model in every API worker,
+# "server" sends classification to one shared model-host process
+# (python -m services.inference_server) over a Unix socket. The socket is
+# created owner-only (0600), inside the project rather than a shared /tmp
+INFERENCE_MODE = "local"
+INFERENCE_SOCKET_PATH = ".cache/inference.sock"
+# Seconds to wait for a server reply (and for the server to come up at warm-up)
+INFERENCE_TIMEOUT = 300
+
+# Cross-request micro-batching of sentiment inference: articles from all
+# in-flight requests are batched up to INFERENCE_MAX_BATCH_SIZE, waiting at
+# most INFERENCE_MAX_WAIT seconds after the first queued article
+INFERENCE_BATCHING_ENABLED = True
+INFERENCE_MAX_BATCH_SIZE = 32
+INFERENCE_MAX_WAIT = 0.05
+
+# Classification results keyed by (classifier, model revision, hash of the
+# normalized article text): an in-memory LRU plus an optional SQLite tier
+CLASSIFICATION_CACHE_ENABLED = True
+CLASSIFICATION_CACHE_MEMORY_ENTRIES = 10000
+CLASSIFICATION_CACHE_DISK_ENABLED = True
+CLASSIFICATION_CACHE_PATH = ".cache/classification_cache.sqlite3"
+CLASSIFICATION_CACHE_MAX_ENTRIES = 200000
+
+# News articles are handed to classification in chunks of this size while
+# scraping continues
+NEWS_CLASSIFY_CHUNK_SIZE = 16
@@ -8,3 +8,9 @@ class Sentiment(str, Enum):
 class ClassifierType(str, Enum):
     FINBERT = "finbert"
     ZEROSHORT = "zeroshort"
+
+class ScrapeStatus(str, Enum):
+    SUCCESS = "success"
+    TRUNCATED = "truncated"
+    SKIPPED = "skipped"
+    FAILED = "failed"
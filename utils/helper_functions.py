@@ -1,6 +1,24 @@
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from models.models import ScrapedRequest
 from typing import List, Dict
 
+# Scrape order of search results: news hits before generic web results
+NEWS_RESULT_PRIORITY = 0
+TEXT_RESULT_PRIORITY = 1
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "source", "cmpid", "icid", "ito",
+    "ncid", "ocid", "sr_share", "share", "smid", "spm", "_ga", "_gl", "amp", "outputtype"
+}
+TRACKING_PARAM_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "at_")
+# Host prefixes of mobile and AMP mirrors of the same site
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+AMP_PATH_RE = re.compile(r"(?:/amp/?|\.amp(?:\.html)?)$", re.IGNORECASE)
+AMP_CACHE_SUFFIX = ".cdn.ampproject.org"
+
 # uncomment for more results
 def generate_initial_search_queries(request: ScrapedRequest) -> List[str]:
     # Generate initial search queries based on the request data
@@ -20,9 +38,106 @@ def generate_follow_up_queries(company: str) -> List[str]:
     return news_queries
 
 def extract_urls_from_results(results: List[Dict]) -> List[str]:
-    urls = []
+    # One URL per article: variants sharing a canonical URL are fetched once
+    return [res.get('href') or res.get('url') for res in dedupe_search_results(results)]
+
+def dedupe_search_results(results: List[Dict]) -> List[Dict]:
+    """
+    Merge search results that point at the same canonical URL.
+    Each merged result keeps the first hit's fields plus 'canonical_url'
+    and 'companies', every company tag seen for that URL in order.
+    """
+    merged: Dict[str, Dict] = {}
     for res in results:
         url = res.get('href') or res.get('url')
-        if url:
-            urls.append(url)
-    return urls
+        if not url:
+            continue
+        canonical = canonicalize_url(url)
+        entry = merged.get(canonical)
+        if entry is None:
+            entry = merged[canonical] = dict(res, canonical_url=canonical, companies=[])
+        else:
+            # Prefer fetching the https variant
+            key = 'href' if entry.get('href') else 'url'
+            if url.lower().startswith("https://") and not entry[key].lower().startswith("https://"):
+                entry[key] = url
+        # Already-merged results carry 'companies', raw hits a single 'company'
+        for company in res.get('companies') or [res.get('company')]:
+            if company and company not in entry['companies']:
+                entry['companies'].append(company)
+    return list(merged.values())
+
+def extract_url_priorities(results: List[Dict]) -> Dict[str, int]:
+    # News results carry 'url', text results carry 'href'
+    priorities = {}
+    for res in results:
+        if res.get('url'):
+            url, priority = res['url'], NEWS_RESULT_PRIORITY
+        elif res.get('href'):
+            url, priority = res['href'], TEXT_RESULT_PRIORITY
+        else:
+            continue
+        priorities[url] = min(priority, priorities.get(url, priority))
+    return priorities
+
+
+def normalize_url(url: str) -> str:
+    """Lower-case scheme and host, drop default ports and the fragment"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def build_url_company_index(results: List[Dict]) -> Dict[str, List[str]]:
+    """Map each canonical URL to every company its search hits were tagged with"""
+    return {
+        res['canonical_url']: res['companies']
+        for res in dedupe_search_results(results)
+        if res['companies']
+    }
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL used for dedup: https scheme, host
+    without www/mobile/AMP prefixes, AMP paths and Google AMP cache URLs
+    collapsed, tracking parameters dropped and the rest sorted.
+    """
+    try:
+        parts = urlsplit(normalize_url(url))
+    except ValueError:
+        return url.strip()
+
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    host = parts.netloc
+    path = parts.path
+
+    # https://example-com.cdn.ampproject.org/c/s/example.com/story -> example.com/story
+    if host.endswith(AMP_CACHE_SUFFIX):
+        segments = path.lstrip("/").split("/")
+        while segments and segments[0] in ("c", "v", "s", "i"):
+            segments.pop(0)
+        if segments and segments[0]:
+            host = segments[0].lower()
+            path = "/" + "/".join(segments[1:])
+
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+
+    path = AMP_PATH_RE.sub("", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    path = path or "/"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
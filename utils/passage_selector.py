@@ -0,0 +1,119 @@
+"""
+Name-anchored passage selection for the company-extraction prompt
+"""
+import re
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+from utils.config import (
+    PASSAGE_WINDOW_WORDS,
+    PASSAGE_TOKEN_BUDGET,
+    PASSAGE_FUZZY_THRESHOLD
+)
+
+_WORD_RE = re.compile(r"\w+(?:['’.\-]\w+)*")
+# Rough words-to-tokens ratio of the Llama/Mistral tokenizers on English news
+TOKENS_PER_WORD = 1.3
+# Fuzzy matching is only tried on tokens at least this long
+MIN_FUZZY_LENGTH = 4
+PASSAGE_SEPARATOR = "\n...\n"
+
+
+def name_aliases(name: str) -> List[Tuple[str, ...]]:
+    """
+    Token sequences that refer to the person: the full name, first + last
+    name, initial + last name and the last name alone.
+    """
+    tokens = tuple(t.lower() for t in _WORD_RE.findall(name))
+    if not tokens:
+        return []
+    aliases = [tokens]
+    if len(tokens) > 1:
+        first, last = tokens[0], tokens[-1]
+        aliases.append((first, last))
+        aliases.append((first[0], last))
+        if len(last) >= MIN_FUZZY_LENGTH:
+            aliases.append((last,))
+    # Longest aliases first so overlapping hits are attributed to them
+    return sorted(set(aliases), key=len, reverse=True)
+
+
+def _fuzzy_equal(word: str, target: str, threshold: float) -> bool:
+    if word == target:
+        return True
+    if len(target) < MIN_FUZZY_LENGTH or abs(len(word) - len(target)) > 2 or word[0] != target[0]:
+        return False
+    matcher = SequenceMatcher(None, word, target)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def select_passages(text: str, name: str,
+                    window_words: int = PASSAGE_WINDOW_WORDS,
+                    token_budget: int = PASSAGE_TOKEN_BUDGET,
+                    fuzzy_threshold: float = PASSAGE_FUZZY_THRESHOLD) -> Optional[str]:
+    """
+    Return the windows of text around mentions of name, merged and cut to
+    token_budget, or None when the page never mentions the person.
+    """
+    if not text or not name:
+        return None
+
+    aliases = name_aliases(name)
+    if not aliases:
+        return None
+
+    words = list(_WORD_RE.finditer(text))
+    lowered = [w.group(0).lower() for w in words]
+
+    # Alias tokens each distinct word stands for; pages repeat words a lot,
+    # so fuzzy comparisons run once per distinct word rather than per word
+    alias_tokens = {token for alias in aliases for token in alias}
+    token_hits = {
+        word: {token for token in alias_tokens if _fuzzy_equal(word, token, fuzzy_threshold)}
+        for word in set(lowered)
+    }
+
+    # Word index ranges [start, end) of every mention
+    mentions = []
+    i = 0
+    while i < len(lowered):
+        if token_hits[lowered[i]]:
+            for alias in aliases:
+                end = i + len(alias)
+                if end <= len(lowered) and all(alias[k] in token_hits[lowered[i + k]] for k in range(len(alias))):
+                    mentions.append((i, end, len(alias)))
+                    i = end - 1
+                    break
+        i += 1
+
+    if not mentions:
+        return None
+
+    # Merge overlapping windows, scoring each by how strongly it names the person
+    windows = []
+    for start, end, strength in mentions:
+        lo, hi = max(start - window_words, 0), min(end + window_words, len(words))
+        if windows and lo <= windows[-1][1]:
+            prev_lo, prev_hi, prev_score = windows[-1]
+            windows[-1] = (prev_lo, max(prev_hi, hi), prev_score + strength)
+        else:
+            windows.append((lo, hi, strength))
+
+    word_budget = int(token_budget / TOKENS_PER_WORD)
+    chosen = []
+    used = 0
+    for lo, hi, _ in sorted(windows, key=lambda w: w[2], reverse=True):
+        remaining = word_budget - used
+        if remaining <= 0:
+            break
+        if hi - lo > remaining:
+            # Trim the window evenly around its centre
+            centre = (lo + hi) // 2
+            lo = max(centre - remaining // 2, lo)
+            hi = lo + remaining
+        chosen.append((lo, hi))
+        used += hi - lo
+
+    chosen.sort()
+    return PASSAGE_SEPARATOR.join(
+        text[words[lo].start():words[hi - 1].end()] for lo, hi in chosen
+    )
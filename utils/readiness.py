@@ -0,0 +1,64 @@
+"""
+Startup readiness of the components warmed up in the FastAPI lifespan
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ReadinessRegistry:
+    """Per-component warm-up state and load time; the app is ready once every required component is"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, name: str, required: bool = True) -> None:
+        with self._lock:
+            self._components[name] = {
+                "state": LOADING,
+                "required": required,
+                "started_at": time.monotonic(),
+                "load_seconds": None,
+                "error": None
+            }
+
+    def ready(self, name: str) -> None:
+        self._finish(name, READY)
+
+    def failed(self, name: str, error: str) -> None:
+        self._finish(name, FAILED, error)
+
+    def _finish(self, name: str, state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            component = self._components.get(name)
+            if component is None:
+                return
+            component["state"] = state
+            component["error"] = error
+            component["load_seconds"] = round(time.monotonic() - component["started_at"], 3)
+
+    def state(self) -> str:
+        """READY, FAILED if a required component failed, otherwise LOADING"""
+        with self._lock:
+            states = {c["state"] for c in self._components.values() if c["required"]}
+        if FAILED in states:
+            return FAILED
+        return LOADING if LOADING in states else READY
+
+    def is_ready(self) -> bool:
+        return self.state() == READY
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {k: v for k, v in component.items() if k != "started_at"}
+                for name, component in self._components.items()
+            }
+
+
+readiness = ReadinessRegistry()
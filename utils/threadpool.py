@@ -1,12 +1,137 @@
 from utils.async_logger import logger
+from utils.config import PARSE_POOL_TYPE, PARSE_POOL_WORKERS
+import asyncio
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+from typing import Any, Callable, Dict, Optional
 
 THREAD_POOL = concurrent.futures.ThreadPoolExecutor(
     max_workers=4,
     thread_name_prefix="sentiment_analysis"
 )
 
+_parse_pool: Optional[concurrent.futures.Executor] = None
+_parse_pool_lock = threading.Lock()
+
+
+class PoolMetrics:
+    """Submission and queue-depth counters for one executor"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(self.in_flight - self.workers, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "queue_depth": self.queue_depth
+        }
+
+
+INFERENCE_METRICS = PoolMetrics("inference", THREAD_POOL._max_workers)
+PARSE_METRICS = PoolMetrics("parsing", PARSE_POOL_WORKERS)
+
+
+def get_parse_pool() -> concurrent.futures.Executor:
+    """Return the HTML parsing pool, creating it on first use"""
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                if PARSE_POOL_TYPE == "process":
+                    # spawn keeps the model-laden parent from being forked
+                    _parse_pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=PARSE_POOL_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    _parse_pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=PARSE_POOL_WORKERS,
+                        thread_name_prefix="html_parsing"
+                    )
+    return _parse_pool
+
+
+def _replace_broken_parse_pool(broken: concurrent.futures.Executor) -> None:
+    """Drop a parse pool whose worker died; the next get_parse_pool() builds a fresh one"""
+    global _parse_pool
+    with _parse_pool_lock:
+        # Several callers can see the same broken pool; only the first replaces it
+        if _parse_pool is broken:
+            _parse_pool = None
+            broken.shutdown(wait=False, cancel_futures=True)
+            logger.error("Parse pool broken by a dead worker process, starting a new one")
+
+
+async def run_in_pool(executor: concurrent.futures.Executor, metrics: PoolMetrics,
+                      fn: Callable, *args) -> Any:
+    """run_in_executor that keeps the pool's metrics up to date"""
+    loop = asyncio.get_running_loop()
+    metrics.submitted += 1
+    metrics.in_flight += 1
+    metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+    try:
+        result = await loop.run_in_executor(executor, fn, *args)
+        metrics.completed += 1
+        return result
+    except BaseException:
+        metrics.failed += 1
+        raise
+    finally:
+        metrics.in_flight -= 1
+
+
+async def run_in_parse_pool(fn: Callable, *args) -> Any:
+    """
+    run_in_pool on the parse pool. A process pool is unusable for good once
+    one worker dies (e.g. out of memory on a huge page), so it is rebuilt
+    and the job retried once.
+    """
+    for attempt in range(2):
+        pool = get_parse_pool()
+        try:
+            return await run_in_pool(pool, PARSE_METRICS, fn, *args)
+        except BrokenProcessPool:
+            _replace_broken_parse_pool(pool)
+            if attempt:
+                raise
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    return {
+        INFERENCE_METRICS.name: INFERENCE_METRICS.snapshot(),
+        PARSE_METRICS.name: PARSE_METRICS.snapshot()
+    }
+
+
 def shutdown_thread_pool():
     """Cleanup function to shutdown the thread pool"""
     THREAD_POOL.shutdown(wait=True)
     logger.info("Thread pool shut down")
+
+
+def shutdown_parse_pool():
+    """Shut down the HTML parsing pool if it was started"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=True, cancel_futures=True)
+            _parse_pool = None
+            logger.info("Parse pool shut down")